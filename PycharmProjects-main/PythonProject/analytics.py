@@ -0,0 +1,342 @@
+import datetime
+import threading
+
+import numpy as np
+
+from perf import span
+
+
+FIELDS = ("duration_min", "calories")
+
+# 1970-01-01 was a Thursday; shifting by this makes Monday weekday 0
+_EPOCH_WEEKDAY = 3
+
+# Most points a line chart draws, however long the history
+MAX_LINE_POINTS = 400
+
+# Duration chart granularity: the first period whose limit (in days of
+# history) covers the span; each keeps the chart to a few hundred points
+PERIOD_SPANS = [("day", 180), ("week", 3 * 365), ("month", float("inf"))]
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_NAT = np.datetime64("NaT", "D").astype(np.int64)
+
+
+def _day_number(date):
+    try:
+        return datetime.date.fromisoformat(date).toordinal() - _EPOCH_ORDINAL
+    except ValueError:
+        # Free-text dates become NaT and drop out of date-based results
+        return _NAT
+
+
+def _parse_dates(dates):
+    # Histories repeat the same few thousand dates, so each is parsed once
+    lookup = {date: _day_number(date) for date in set(dates)}
+    days = np.fromiter(map(lookup.__getitem__, dates), dtype=np.int64, count=len(dates))
+    return days.view("datetime64[D]")
+
+
+def _as_day(date):
+    return np.datetime64(date, "D")
+
+
+class WorkoutColumns:
+    """A user's workouts as columnar NumPy arrays, for vectorized analytics.
+
+    Columns are ``dates`` (datetime64[D]), ``duration_min``, ``calories``
+    and ``type_code`` (an index into ``types``), in the order workouts were
+    added. New workouts are queued by ``extend`` and appended on the next
+    read, and every derived result is cached until the data changes.
+
+    Charts read it from a worker thread while the Tk thread adds
+    workouts, so queueing, flushing and caching happen under a lock.
+    Flushing builds new arrays rather than growing the old ones, so a
+    result handed out earlier never changes underneath its reader.
+    """
+
+    def __init__(self, workouts=()):
+        self.types = []
+        self._type_codes = {}
+        self.dates = np.empty(0, dtype="datetime64[D]")
+        self.duration_min = np.empty(0, dtype=np.int64)
+        self.calories = np.empty(0, dtype=np.int64)
+        self.type_code = np.empty(0, dtype=np.int32)
+        self._pending = []
+        self._cache = {}
+        # Reentrant: cached results are computed from other cached results
+        self._lock = threading.RLock()
+        self.extend(workouts)
+
+    def __len__(self):
+        return len(self.dates) + len(self._pending)
+
+    def extend(self, workouts):
+        with self._lock:
+            self._pending.extend(workouts)
+            self._cache.clear()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with span("analytics:flush", "analytics", rows=len(pending)):
+            # One pass over the dicts, then one conversion per column
+            dates, minutes, calories, codes = [], [], [], []
+            for w in pending:
+                dates.append(w.get("date", ""))
+                minutes.append(w.get("duration_min", 0))
+                calories.append(w.get("calories", 0))
+                workout_type = w.get("type", "")
+                code = self._type_codes.get(workout_type)
+                if code is None:
+                    code = self._type_codes[workout_type] = len(self.types)
+                    self.types.append(workout_type)
+                codes.append(code)
+            self.dates = np.concatenate([self.dates, _parse_dates(dates)])
+            self.duration_min = np.concatenate([self.duration_min, np.array(minutes, dtype=np.int64)])
+            self.calories = np.concatenate([self.calories, np.array(calories, dtype=np.int64)])
+            self.type_code = np.concatenate([self.type_code, np.array(codes, dtype=np.int32)])
+
+    def _cached(self, key, compute):
+        with self._lock:
+            self._flush()
+            result = self._cache.get(key)
+            if result is None:
+                with span(f"analytics:{key if isinstance(key, str) else key[0]}", "analytics"):
+                    result = self._cache[key] = compute()
+            return result
+
+    def column(self, field):
+        with self._lock:
+            self._flush()
+            return getattr(self, field)
+
+    def daily(self):
+        """(days, counts, {field: totals}) with one entry per day from the first workout to the last"""
+        def compute():
+            dated = ~np.isnat(self.dates)
+            if not dated.any():
+                return np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.int64), {
+                    field: np.empty(0, dtype=np.int64) for field in FIELDS
+                }
+            dates = self.dates[dated]
+            first = dates.min()
+            offsets = (dates - first).astype(np.int64)
+            length = int(offsets.max()) + 1
+            days = first + np.arange(length)
+            counts = np.bincount(offsets, minlength=length)
+            totals = {
+                field: np.bincount(offsets, weights=getattr(self, field)[dated], minlength=length).astype(np.int64)
+                for field in FIELDS
+            }
+            return days, counts, totals
+
+        return self._cached("daily", compute)
+
+    def daily_totals(self, field, start, end):
+        """Totals of a field, or "count", for each day start..end inclusive, 0 where nothing was logged"""
+        days, counts, totals = self.daily()
+        values = counts if field == "count" else totals[field]
+        start, end = _as_day(start), _as_day(end)
+        out = np.zeros(int((end - start).astype(np.int64)) + 1, dtype=np.int64)
+        if len(days):
+            lo = max(start, days[0])
+            hi = min(end, days[-1])
+            if lo <= hi:
+                src = (lo - days[0]).astype(np.int64)
+                dst = (lo - start).astype(np.int64)
+                n = int((hi - lo).astype(np.int64)) + 1
+                out[dst:dst + n] = values[src:src + n]
+        return out
+
+    def grouped_sum(self, field, by):
+        """(keys, totals) of a field, or "count", grouped by "day", "week", "month" or "type".
+
+        Day, week and month groups run from the first workout to the last
+        with empty periods included as 0; week keys are the Monday each
+        ISO week starts on and month keys are datetime64[M].
+        """
+        def compute():
+            if by == "type":
+                weights = None if field == "count" else getattr(self, field)
+                totals = np.bincount(self.type_code, weights=weights, minlength=len(self.types))
+                return np.array(self.types, dtype=object), totals.astype(np.int64)
+            days, counts, totals = self.daily()
+            values = counts if field == "count" else totals[field]
+            if by == "day":
+                return days, values
+            if by == "week":
+                starts = days - (days.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+            else:
+                starts = days.astype("datetime64[M]")
+            keys, groups = np.unique(starts, return_inverse=True)
+            return keys, np.bincount(groups, weights=values, minlength=len(keys)).astype(np.int64)
+
+        return self._cached(("grouped", field, by), compute)
+
+    def rolling_mean(self, field, window, start=None, end=None):
+        """(days, means) of a field's daily totals over a trailing window of days.
+
+        Covers start..end, by default the first to the last workout; days
+        without workouts, including those before the first, count as 0.
+        """
+        def compute():
+            days, _, _ = self.daily()
+            if not len(days):
+                return days, np.empty(0)
+            first = _as_day(start) if start else days[0]
+            last = _as_day(end) if end else days[-1]
+            values = self.daily_totals(field, first - (window - 1), last)
+            sums = np.cumsum(np.concatenate([[0], values]))
+            return first + np.arange(len(values) - window + 1), (sums[window:] - sums[:-window]) / window
+
+        return self._cached(("rolling", field, window, start, end), compute)
+
+    def streaks(self, today=None):
+        """(current, longest) runs of consecutive days with a workout.
+
+        The current streak still counts if today has no workout yet but
+        yesterday did.
+        """
+        def compute():
+            # Under the cache lock, so the runs match the daily totals they came from
+            days, counts, _ = self.daily()
+            if not len(days):
+                return None
+            active = np.concatenate([[0], (counts > 0).astype(np.int8), [0]])
+            edges = np.diff(active)
+            starts = np.flatnonzero(edges == 1)
+            ends = np.flatnonzero(edges == -1)
+            return days[0], starts, ends
+
+        runs = self._cached("streaks", compute)
+        if runs is None:
+            return 0, 0
+        first, starts, ends = runs
+        longest = int((ends - starts).max())
+        today = _as_day(today or datetime.date.today())
+        # The last run ends on the last day with a workout
+        last_day = first + int(ends[-1]) - 1
+        current = int(ends[-1] - starts[-1]) if today - last_day <= np.timedelta64(1, "D") else 0
+        return current, longest
+
+    def percentiles(self, field, q=(50, 90)):
+        """Percentiles of a field across individual workouts"""
+        def compute():
+            values = self.column(field)
+            if not len(values):
+                return np.zeros(len(q))
+            return np.percentile(values, q)
+
+        return self._cached(("percentiles", field, tuple(q)), compute)
+
+
+def lttb(xs, ys, threshold):
+    """Downsample a line to threshold points with Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept; every bucket in between keeps
+    the point forming the largest triangle with the previous pick and
+    the next bucket's average, so peaks and dips survive. xs must be
+    numeric and ascending.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(xs), list(ys)
+
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[end:next_end]) / (next_end - end)
+        avg_y = sum(ys[end:next_end]) / (next_end - end)
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return [xs[i] for i in picked], [ys[i] for i in picked]
+
+
+def minutes_by_period(analytics, max_points=MAX_LINE_POINTS):
+    """(period, dates, minutes) for the duration chart.
+
+    Totals are the analytics' grouped sums by day, ISO week or month,
+    whichever keeps the history's span to a readable number of points;
+    periods without workouts count as 0. The line is then thinned with
+    LTTB, so it never has more than max_points points.
+    """
+    days, _ = analytics.grouped_sum("duration_min", "day")
+    if not len(days):
+        return "day", np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.int64)
+
+    span = int((days[-1] - days[0]).astype(np.int64))
+    period = next(p for p, limit in PERIOD_SPANS if span <= limit)
+    starts, minutes = analytics.grouped_sum("duration_min", period)
+    ordinals = starts.astype("datetime64[D]").astype(np.int64)
+    ordinals, minutes = lttb(ordinals.tolist(), minutes.tolist(), max_points)
+    return period, np.array(ordinals, dtype=np.int64).view("datetime64[D]"), np.array(minutes)
+
+
+def year_grid(analytics, today, field="duration_min"):
+    """(grid, peak, month_ticks) for a 53-week calendar heatmap ending today's week.
+
+    grid is 7 rows (Monday first) by 53 week columns of daily totals,
+    sliced from the cached daily series; days after today are NaN so
+    they stay blank. month_ticks are (column, "Jan") for the first week
+    column of each month.
+    """
+    today = np.datetime64(today, "D")
+    # Monday of the week 52 weeks before this one
+    this_monday = today - (today.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+    first_day = this_monday - 52 * 7
+    values = analytics.daily_totals(field, first_day, this_monday + 6).astype(float)
+    values[int((today - first_day).astype(np.int64)) + 1:] = np.nan
+
+    months = (first_day + np.arange(53) * 7).astype("datetime64[M]")
+    firsts = np.flatnonzero(np.concatenate([[True], months[1:] != months[:-1]]))
+    month_ticks = [(int(i), months[i].astype(datetime.date).strftime("%b")) for i in firsts]
+    return values.reshape(53, 7).T, float(np.nanmax(values)), month_ticks
+
+
+def type_totals(analytics):
+    """(types, counts, minutes) for each workout type, most minutes first"""
+    types, minutes = analytics.grouped_sum("duration_min", "type")
+    _, counts = analytics.grouped_sum("count", "type")
+    order = np.argsort(-minutes, kind="stable")
+    return types[order], counts[order], minutes[order]
+
+
+def summary(analytics, today):
+    """Headline stats for reports, as plain ints and floats so they serialize to JSON"""
+    current, longest = analytics.streaks(today)
+    p50, p90 = analytics.percentiles("duration_min", (50, 90))
+    stats = {
+        "workouts": len(analytics),
+        "duration_min": int(analytics.column("duration_min").sum()),
+        "calories": int(analytics.column("calories").sum()),
+        "current_streak": current,
+        "longest_streak": longest,
+        "duration_p50": float(p50),
+        "duration_p90": float(p90),
+    }
+    for days in (7, 30):
+        start = today - datetime.timedelta(days=days - 1)
+        stats[f"last_{days}_days"] = {
+            field: int(analytics.daily_totals(field, start, today).sum())
+            for field in ("count", "duration_min", "calories")
+        }
+    types, counts, minutes = type_totals(analytics)
+    stats["by_type"] = {
+        workout_type: {"count": int(count), "duration_min": int(total)}
+        for workout_type, count, total in zip(types, counts, minutes)
+    }
+    return stats
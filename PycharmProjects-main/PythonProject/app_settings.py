@@ -0,0 +1,22 @@
+from json_files import read_json, write_json_atomic
+
+
+SETTINGS_FILE = "settings.json"
+
+DEFAULT_SETTINGS = {
+    "dark_mode": True,
+    "sidebar_collapsed": False,
+    "storage_backend": "sqlite",
+    "warm_up_charts": True,
+    "performance_panel": False
+}
+
+
+def load_settings():
+    out = DEFAULT_SETTINGS.copy()
+    out.update(read_json(SETTINGS_FILE, {}))
+    return out
+
+
+def save_settings(s):
+    write_json_atomic(SETTINGS_FILE, s)
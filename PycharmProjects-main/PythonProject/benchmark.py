@@ -0,0 +1,333 @@
+import argparse
+import csv
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from csv_import import IMPORT_BATCH_SIZE
+from repository import WorkoutRepository
+from storage import JsonStorage, SQLiteStorage
+from workout import WORKOUT_FIELDS, parse_workout
+
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Generated CSVs are kept here so reruns compare like with like
+DATASET_DIR = os.path.join("cache", "benchmark")
+
+# Fixed so every run benchmarks the same data; "today" for the dashboard
+# and chart cases is the last day of the generated history
+DEFAULT_SEED = 1234
+BENCH_TODAY = datetime.date(2024, 12, 31)
+
+# Whole-dataset cases (import, load, export) run this many times
+DEFAULT_REPEAT = 3
+
+# Per-operation cases (dashboard refresh, a single save) run this many times
+DEFAULT_OPS = 200
+
+# Slower than the baseline's p50 by more than this counts as a regression,
+# as long as it is also slower by more than timer noise
+DEFAULT_THRESHOLD = 0.2
+MIN_REGRESSION_MS = 0.1
+
+BENCH_USER = "bench"
+
+BENCH_TYPES = [
+    "Running", "Cycling", "Swimming", "Weight Training", "Yoga",
+    "Walking", "Hiking", "Rowing", "HIIT", "Other"
+]
+
+
+# Datasets
+# ---------------------------
+def generate_csv(path, size, seed, today=BENCH_TODAY):
+    """Write size random workouts spread over the five years up to today"""
+    rng = random.Random(seed)
+    first = today - datetime.timedelta(days=5 * 365)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(WORKOUT_FIELDS)
+        for _ in range(size):
+            date = first + datetime.timedelta(days=rng.randrange(5 * 365 + 1))
+            duration = rng.randint(10, 120)
+            writer.writerow([
+                date.isoformat(),
+                rng.choice(BENCH_TYPES),
+                duration,
+                duration * rng.randint(4, 12),
+                "felt good" if rng.random() < 0.1 else "",
+                f"{date.isoformat()}T07:00:00"
+            ])
+    os.replace(tmp, path)
+
+
+def dataset_csv(size, seed):
+    """The benchmark CSV for a size, generated on first use"""
+    path = os.path.join(DATASET_DIR, f"workouts-{size}-{seed}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {size:,} workouts...", file=sys.stderr)
+        generate_csv(path, size, seed)
+    return path
+
+
+# Measurement
+# ---------------------------
+def percentile(samples, q):
+    """Nearest-rank percentile of a sorted list"""
+    return samples[max(0, min(len(samples) - 1, math.ceil(q / 100 * len(samples)) - 1))]
+
+
+def run_case(run, setup=None, runs=1, memory=True):
+    """Time run(state) runs times, then once more under tracemalloc for its peak memory.
+
+    setup() is called untimed before every run and its result passed in;
+    run returns how many workouts it handled, or None for a single
+    operation, so "per_s" is workouts or operations per second.
+    """
+    seconds = []
+    items = 1
+    for _ in range(runs):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        items = run(state) or 1
+        seconds.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        state = setup() if setup else None
+        tracemalloc.start()
+        try:
+            run(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    seconds.sort()
+    p50 = percentile(seconds, 50)
+    return {
+        "runs": runs,
+        "items": items,
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(percentile(seconds, 99) * 1000, 3),
+        "per_s": round(items / p50 if p50 else 0, 1),
+        "peak_mb": round(peak / 1e6, 2) if peak is not None else None
+    }
+
+
+# Cases
+# ---------------------------
+def fresh_sqlite(workdir):
+    path = os.path.join(workdir, "bench.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    storage = SQLiteStorage(path)
+    storage.create_user(BENCH_USER, "bench")
+    return storage
+
+
+def fresh_json(workdir):
+    shutil.rmtree(os.path.join(workdir, "user_data"), ignore_errors=True)
+    storage = JsonStorage(os.path.join(workdir, "users.json"), os.path.join(workdir, "user_data"),
+                          compact_bytes=float("inf"))
+    storage.create_user(BENCH_USER, "bench")
+    return storage
+
+
+def open_json(workdir):
+    return JsonStorage(os.path.join(workdir, "users.json"), os.path.join(workdir, "user_data"))
+
+
+def import_into(storage, csv_path, batch_size):
+    repository = WorkoutRepository(storage, BENCH_USER)
+    imported = sum(added for added, _, _, _ in repository.import_csv(csv_path, batch_size))
+    if isinstance(storage, JsonStorage):
+        storage.compact([BENCH_USER])
+    storage.close()
+    return imported
+
+
+def load_user(storage):
+    count = len(storage.get_user(BENCH_USER)["workouts"])
+    storage.close()
+    return count
+
+
+def bench_size(size, args, today=BENCH_TODAY):
+    """Every case for one dataset size, as {case name: result}"""
+    from analytics import WorkoutColumns, minutes_by_period, summary, type_totals, year_grid
+
+    csv_path = dataset_csv(size, args.seed)
+    workdir = tempfile.mkdtemp(prefix="fitness-bench-")
+    results = {}
+
+    def case(name, run, setup=None, runs=args.repeat):
+        print(f"  {name}...", file=sys.stderr)
+        results[name] = run_case(run, setup, runs, args.memory)
+
+    try:
+        # Import cases leave their storage behind for the cases after them
+        case("import_csv[sqlite]", lambda storage: import_into(storage, csv_path, args.batch_size),
+             setup=lambda: fresh_sqlite(workdir))
+        case("import_csv[json]", lambda storage: import_into(storage, csv_path, args.batch_size),
+             setup=lambda: fresh_json(workdir))
+
+        db_path = os.path.join(workdir, "bench.db")
+        case("load[sqlite]", load_user, setup=lambda: SQLiteStorage(db_path))
+        case("load[json]", load_user, setup=lambda: open_json(workdir))
+
+        out_path = os.path.join(workdir, "export.csv")
+        storage = SQLiteStorage(db_path)
+        case("export_csv[sqlite]", lambda _: WorkoutRepository(storage, BENCH_USER).export_csv(out_path))
+
+        workouts = storage.get_user(BENCH_USER)["workouts"]
+        # What opening Analytics costs the first time
+        def build_analytics(_):
+            WorkoutColumns(workouts).daily()
+            return len(workouts)
+
+        case("analytics_build", build_analytics)
+
+        # The dashboard's refresh: today's day rollup plus today's cards
+        iso_today = today.isoformat()
+
+        def dashboard_today(_):
+            workouts.rollups.get("day", iso_today)
+            workouts.on_date(iso_today)
+
+        case("dashboard_today", dashboard_today, runs=args.ops)
+
+        analytics = workouts.analytics
+
+        # Chart data, each from cold caches as after a save
+        def uncached(name, compute):
+            def run(_):
+                compute()
+            case(name, run, setup=lambda: analytics.extend(()), runs=args.ops)
+
+        week = (today - datetime.timedelta(days=6), today)
+        uncached("weekly_calories", lambda: analytics.daily_totals("calories", *week))
+        uncached("duration_chart", lambda: minutes_by_period(analytics))
+        uncached("heatmap", lambda: year_grid(analytics, today))
+        uncached("type_breakdown", lambda: type_totals(analytics))
+        uncached("summary", lambda: summary(analytics, today))
+
+        def save_one(repository):
+            repository.add_workout(parse_workout({
+                "date": iso_today, "type": "Running", "duration_min": "30", "calories": "300"
+            }))
+
+        sqlite_repository = WorkoutRepository(storage, BENCH_USER)
+        case("save_workout[sqlite]", save_one, setup=lambda: sqlite_repository, runs=args.ops)
+        storage.close()
+
+        json_storage = open_json(workdir)
+        json_repository = WorkoutRepository(json_storage, BENCH_USER)
+        # Load the account first, as logging in does
+        len(json_repository.workouts)
+        case("save_workout[json]", save_one, setup=lambda: json_repository, runs=args.ops)
+        json_storage.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+# Reporting
+# ---------------------------
+def print_results(results, baseline=None, threshold=DEFAULT_THRESHOLD):
+    """Print a results table; returns the names of cases slower than the baseline"""
+    regressions = []
+    print(f"{'case':<38}{'runs':>6}{'p50 ms':>12}{'p99 ms':>12}{'per s':>14}{'peak MB':>10}  vs baseline")
+    for name, r in results.items():
+        peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:,.1f}"
+        line = f"{name:<38}{r['runs']:>6}{r['p50_ms']:>12,.3f}{r['p99_ms']:>12,.3f}{r['per_s']:>14,.0f}{peak:>10}"
+        base = (baseline or {}).get(name)
+        if base and base["p50_ms"]:
+            ratio = r["p50_ms"] / base["p50_ms"]
+            line += f"  {ratio:.2f}x"
+            if ratio > 1 + threshold and r["p50_ms"] - base["p50_ms"] > MIN_REGRESSION_MS:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def parse_sizes(text):
+    try:
+        return [SIZES[size.strip().lower()] for size in text.split(",")]
+    except KeyError as e:
+        raise argparse.ArgumentTypeError(f"unknown size {e.args[0]!r}, choose from {', '.join(SIZES)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmark",
+        description="Time storage, CSV import/export and analytics on synthetic datasets."
+    )
+    parser.add_argument("--sizes", type=parse_sizes, default=list(SIZES.values()),
+                        help=f"comma-separated dataset sizes (default: {','.join(SIZES)})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"runs of each whole-dataset case (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--ops", type=int, default=DEFAULT_OPS,
+                        help=f"runs of each per-operation case (default: {DEFAULT_OPS})")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                        help=f"CSV rows per import batch (default: {IMPORT_BATCH_SIZE})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip the extra tracemalloc run of each case that measures peak memory")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"p50 slowdown counted as a regression (default: {DEFAULT_THRESHOLD * 100:.0f}%%)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for size in args.sizes:
+        print(f"{size:,} workouts", file=sys.stderr)
+        for name, result in bench_size(size, args).items():
+            results[f"{size}/{name}"] = result
+
+    regressions = print_results(results, baseline, args.threshold)
+
+    if args.save:
+        import numpy
+        report = {
+            "meta": {
+                "at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": numpy.__version__,
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "ops": args.ops
+            },
+            "results": results
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}", file=sys.stderr)
+
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import threading
+import tkinter as tk
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+from matplotlib.figure import Figure
+
+from perf import span
+
+
+SPINNER_FRAMES = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+
+
+class _LockedCanvas(FigureCanvasTkAgg):
+    """FigureCanvasTkAgg whose own draws and resizes wait for background renders"""
+
+    def __init__(self, figure, master, lock):
+        self.lock = lock
+        super().__init__(figure, master=master)
+
+    def draw(self):
+        with self.lock:
+            super().draw()
+
+    def resize(self, event):
+        with self.lock:
+            super().resize(event)
+
+
+class ChartJob(threading.Thread):
+    """Prepares and rasterizes one chart off the Tk thread.
+
+    ``prepare()`` computes the chart's data. ``apply(data)`` then updates
+    the artists and the figure is rendered with Agg, both under the
+    view's lock so a Tk resize cannot draw the figure at the same time.
+    The Tk thread only blits the finished buffer (see ChartView.finish).
+    A cancelled job stops at the next step boundary and its result is
+    never shown. ``error`` holds the exception if a step failed.
+    """
+
+    def __init__(self, view, prepare, apply, name="chart"):
+        super().__init__(daemon=True, name=f"chart-{name}")
+        self.view = view
+        self.chart = name
+        self.prepare = prepare
+        self.apply = apply
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.error = None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        try:
+            with span(f"chart:prepare:{self.chart}", "chart"):
+                data = self.prepare()
+            if self.cancelled.is_set():
+                return
+            with self.view.lock:
+                if self.cancelled.is_set():
+                    return
+                with span(f"chart:render:{self.chart}", "chart"):
+                    self.apply(data)
+                    FigureCanvasAgg.draw(self.view.canvas)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+
+class ChartView:
+    """The single figure and canvas behind the Analytics window.
+
+    Every chart gets its own axes in the one figure, created the first
+    time it is shown. Switching charts hides the other axes and the
+    chart updates its existing artists in place, so pressing the buttons
+    never adds figures, canvases or artists. The figure comes from
+    Figure rather than pyplot, so nothing outlives ``close``.
+
+    Charts are drawn by ``start``, which runs a ChartJob; ``spin`` shows
+    a spinner over the canvas until ``finish`` is called with the job.
+    """
+
+    def __init__(self, master, figsize=(8, 5), bg=None, fg=None):
+        self.lock = threading.RLock()
+        self.figure = Figure(figsize=figsize)
+        self.canvas = _LockedCanvas(self.figure, master, self.lock)
+        self.widget = self.canvas.get_tk_widget()
+        self.widget.pack(fill="both", expand=True)
+        self.charts = {}
+        self.message = self.figure.text(0.5, 0.5, "", ha="center", va="center", fontsize=12, color="gray")
+        self.job = None
+        self.spinner = tk.Label(master, text="", font=("Segoe UI", 12), bg=bg, fg=fg, padx=12, pady=6)
+        self.spinner_frame = 0
+
+    def axes(self, name, rows=1):
+        """Show only a chart's axes; returns (axes, created) so callers know to add artists.
+
+        With rows > 1 the chart gets that many stacked axes sharing the x
+        axis, returned as a list.
+        """
+        axes = self.charts.get(name)
+        created = axes is None
+        if created:
+            axes = self.charts[name] = []
+            for row in range(rows):
+                axes.append(self.figure.add_subplot(
+                    rows, 1, row + 1,
+                    label=f"{name}-{row}",
+                    sharex=axes[0] if axes else None
+                ))
+        for other, chart_axes in self.charts.items():
+            for ax in chart_axes:
+                ax.set_visible(other == name)
+        self.message.set_visible(False)
+        return (axes if rows > 1 else axes[0]), created
+
+    def show_message(self, text):
+        for chart_axes in self.charts.values():
+            for ax in chart_axes:
+                ax.set_visible(False)
+        self.message.set_text(text)
+        self.message.set_visible(True)
+
+    def start(self, prepare, apply, name="chart"):
+        """Draw a chart on a worker thread, cancelling any chart still being drawn"""
+        if self.job:
+            self.job.cancel()
+        self.job = ChartJob(self, prepare, apply, name)
+        self.job.start()
+        return self.job
+
+    def spin(self):
+        """Show or advance the spinner while a job runs"""
+        if not self.spinner.winfo_ismapped():
+            self.spinner.place(relx=0.5, rely=0.5, anchor="center")
+            self.spinner.lift()
+        self.spinner_frame = (self.spinner_frame + 1) % len(SPINNER_FRAMES)
+        self.spinner.config(text=f"{SPINNER_FRAMES[self.spinner_frame]}  Drawing chart…")
+
+    def finish(self, job):
+        """Show a finished job's render; returns its error, if any"""
+        self.job = None
+        self.spinner.place_forget()
+        if job.error is None:
+            with span(f"chart:blit:{job.chart}", "chart"), self.lock:
+                self.canvas.blit()
+        return job.error
+
+    def close(self):
+        if self.job:
+            self.job.cancel()
+            self.job = None
+        with self.lock:
+            self.figure.clear()
+            self.charts.clear()
@@ -0,0 +1,20 @@
+import csv
+
+from perf import span
+from workout import WORKOUT_FIELDS
+
+
+def write_workouts_csv(f, workouts):
+    """Write workouts to an open text file as CSV a row at a time; returns how many were written"""
+    writer = csv.DictWriter(f, fieldnames=WORKOUT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for workout in workouts:
+        writer.writerow(workout)
+        count += 1
+    return count
+
+
+def export_workouts_csv(path, workouts):
+    with span("csv:export", "io"), open(path, "w", newline="", encoding="utf-8") as f:
+        return write_workouts_csv(f, workouts)
@@ -0,0 +1,76 @@
+import csv
+import io
+import os
+import queue
+import threading
+
+from perf import span
+from workout import parse_workout
+
+
+# Rows parsed per batch; each batch is committed in one storage transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Parsed batches allowed to wait for the UI before the reader blocks
+MAX_PENDING_BATCHES = 4
+
+
+def iter_import_batches(path, batch_size=IMPORT_BATCH_SIZE):
+    """Stream a CSV file as (workouts, errors, bytes_read, total_bytes) batches.
+
+    Only one batch is held at a time, so memory stays flat for any file
+    size. errors is a list of (line_number, message) for rejected rows.
+    """
+    total = os.path.getsize(path)
+    with open(path, "rb") as raw:
+        f = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        reader = csv.DictReader(f)
+        workouts, errors = [], []
+        for row in reader:
+            try:
+                workouts.append(parse_workout(row))
+            except ValueError as e:
+                errors.append((reader.line_num, str(e)))
+            if len(workouts) + len(errors) >= batch_size:
+                yield workouts, errors, raw.tell(), total
+                workouts, errors = [], []
+        yield workouts, errors, total, total
+
+
+class ImportWorker(threading.Thread):
+    """Parses a CSV on a background thread and hands batches over a bounded queue.
+
+    The UI thread drains ``queue`` and commits each batch itself, since the
+    storage backends belong to the thread that opened them. Messages are
+    ("batch", workouts, errors, bytes_read, total_bytes), ("error", message)
+    and finally ("done",).
+    """
+
+    def __init__(self, path, batch_size=IMPORT_BATCH_SIZE):
+        super().__init__(daemon=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=MAX_PENDING_BATCHES)
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _put(self, message):
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run(self):
+        with span("csv:read", "io"):
+            try:
+                for batch in iter_import_batches(self.path, self.batch_size):
+                    if not self._put(("batch",) + batch):
+                        return
+            except (OSError, UnicodeDecodeError, csv.Error) as e:
+                self._put(("error", str(e)))
+        self._put(("done",))
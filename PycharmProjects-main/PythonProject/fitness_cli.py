@@ -0,0 +1,219 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+
+from app_settings import load_settings
+from csv_export import write_workouts_csv
+from csv_import import IMPORT_BATCH_SIZE
+from repository import WorkoutRepository
+from storage import JsonStorage, open_storage
+
+
+# Rejected CSV rows printed by "import"; the rest are only counted
+MAX_REPORTED_ERRORS = 10
+
+# Seconds between progress lines during a long import or export
+PROGRESS_INTERVAL = 5
+
+
+class CommandError(Exception):
+    """A problem with the command's input, reported without a traceback"""
+
+
+# Helpers
+# ---------------------------
+def open_app_storage(args):
+    if args.data_dir:
+        # Storage files are relative to the app folder, as in the GUI
+        os.chdir(args.data_dir)
+    backend = args.backend or load_settings().get("storage_backend", "sqlite")
+    if backend == "json":
+        # Every background compaction rewrites the whole snapshot, which
+        # makes a bulk import quadratic; "import" compacts once at the end
+        return JsonStorage(compact_bytes=float("inf"))
+    return open_storage(backend)
+
+
+def open_repository(storage, username):
+    if not storage.user_exists(username):
+        raise CommandError(f"unknown user {username!r}")
+    return WorkoutRepository(storage, username)
+
+
+def report(verb, count, seconds, nbytes=None):
+    """Print a throughput line to stderr, keeping stdout for data"""
+    seconds = max(seconds, 1e-9)
+    rates = [f"{count / seconds:,.0f} rows/s"]
+    if nbytes is not None:
+        rates.append(f"{nbytes / seconds / 1e6:.1f} MB/s")
+    print(f"{verb} {count:,} workouts in {seconds:.2f} s ({', '.join(rates)})", file=sys.stderr)
+
+
+def storage_bytes(storage):
+    if isinstance(storage, JsonStorage):
+        # Backups are the previous copies of files, not part of the data
+        paths = [storage.path] + [
+            os.path.join(storage.data_dir, name) for name in os.listdir(storage.data_dir)
+            if not name.endswith((".bak", ".corrupt"))
+        ]
+    else:
+        paths = [storage.path, storage.path + "-wal"]
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+
+# Commands
+# ---------------------------
+def import_command(storage, args):
+    """Stream a CSV into an account one batch (and one transaction) at a time"""
+    repository = open_repository(storage, args.user)
+    start = last_progress = time.perf_counter()
+    imported = skipped = 0
+    total_bytes = 0
+    try:
+        for added, errors, bytes_read, total_bytes in repository.import_csv(args.csv, args.batch_size):
+            imported += added
+            for line, message in errors:
+                if skipped < args.max_errors:
+                    print(f"line {line}: {message}", file=sys.stderr)
+                skipped += 1
+            now = time.perf_counter()
+            if now - last_progress >= PROGRESS_INTERVAL:
+                percent = 100 * bytes_read / total_bytes if total_bytes else 100
+                print(f"{percent:.0f}% - {imported:,} imported, {skipped:,} skipped", file=sys.stderr)
+                last_progress = now
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise CommandError(f"failed to read {args.csv}: {e}")
+    finally:
+        if isinstance(storage, JsonStorage):
+            storage.compact([args.user])
+
+    report("Imported", imported, time.perf_counter() - start, total_bytes)
+    if skipped:
+        print(f"Skipped {skipped:,} invalid rows", file=sys.stderr)
+    return 0
+
+
+def export_command(storage, args):
+    """Write an account's workouts as CSV, a row at a time"""
+    repository = open_repository(storage, args.user)
+    start = time.perf_counter()
+    to_stdout = args.csv == "-"
+    try:
+        f = sys.stdout if to_stdout else open(args.csv, "w", newline="", encoding="utf-8")
+    except OSError as e:
+        raise CommandError(f"failed to open {args.csv}: {e}")
+
+    try:
+        count = write_workouts_csv(f, repository.iter_workouts())
+        nbytes = None if to_stdout else f.tell()
+    finally:
+        if not to_stdout:
+            f.close()
+
+    report("Exported", count, time.perf_counter() - start, nbytes)
+    return 0
+
+
+def stats_command(storage, args):
+    """Print totals, streaks and per-type breakdowns from the analytics summary"""
+    from analytics import summary
+
+    repository = open_repository(storage, args.user)
+    start = time.perf_counter()
+    analytics = repository.workouts.analytics
+    loaded = time.perf_counter()
+    stats = dict(user=args.user, **summary(analytics, datetime.date.today()))
+    done = time.perf_counter()
+
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print_stats(stats)
+    report("Loaded", stats["workouts"], loaded - start)
+    print(f"Computed stats in {(done - loaded) * 1000:.0f} ms", file=sys.stderr)
+    return 0
+
+
+def print_stats(stats):
+    print(f"Workouts         {stats['workouts']:,}")
+    print(f"Total minutes    {stats['duration_min']:,}")
+    print(f"Total calories   {stats['calories']:,}")
+    print(f"Current streak   {stats['current_streak']} days")
+    print(f"Longest streak   {stats['longest_streak']} days")
+    print(f"Workout length   {stats['duration_p50']:g} min median, {stats['duration_p90']:g} min p90")
+    for days in (7, 30):
+        recent = stats[f"last_{days}_days"]
+        print(f"{f'Last {days} days':<17}{recent['count']:,} workouts, "
+              f"{recent['duration_min']:,} min, {recent['calories']:,} kcal")
+    if stats["by_type"]:
+        print()
+        width = max(len(workout_type) for workout_type in stats["by_type"])
+        for workout_type, totals in stats["by_type"].items():
+            print(f"  {workout_type:<{width}}  {totals['count']:>7,} workouts  {totals['duration_min']:>10,} min")
+
+
+def compact_command(storage, args):
+    """Fold journals into snapshots (JSON) or vacuum the database (SQLite)"""
+    before = storage_bytes(storage)
+    start = time.perf_counter()
+    storage.compact()
+    seconds = time.perf_counter() - start
+    after = storage_bytes(storage)
+    print(f"Compacted storage in {seconds:.2f} s: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB", file=sys.stderr)
+    return 0
+
+
+# Entry Point
+# ---------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="fitness_cli",
+        description="Import, export and report on fitness tracker data without starting the app."
+    )
+    parser.add_argument("--data-dir", help="folder holding the app's data files (default: current folder)")
+    parser.add_argument("--backend", choices=["sqlite", "json"],
+                        help="storage backend (default: storage_backend from settings.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import", help="import workouts from a CSV file")
+    p.add_argument("user")
+    p.add_argument("csv")
+    p.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                   help=f"rows committed per transaction (default: {IMPORT_BATCH_SIZE})")
+    p.add_argument("--max-errors", type=int, default=MAX_REPORTED_ERRORS,
+                   help=f"invalid rows to list before only counting them (default: {MAX_REPORTED_ERRORS})")
+    p.set_defaults(run=import_command)
+
+    p = commands.add_parser("export", help="export workouts to a CSV file")
+    p.add_argument("user")
+    p.add_argument("csv", nargs="?", default="-", help="output file, or - for stdout (default)")
+    p.set_defaults(run=export_command)
+
+    p = commands.add_parser("stats", help="print workout statistics")
+    p.add_argument("user")
+    p.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    p.set_defaults(run=stats_command)
+
+    p = commands.add_parser("compact", help="compact the storage files")
+    p.set_defaults(run=compact_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    storage = open_app_storage(args)
+    try:
+        return args.run(storage, args)
+    except CommandError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
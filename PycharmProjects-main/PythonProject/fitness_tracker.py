@@ -1,66 +1,158 @@
+import time
+
+# Taken before the other imports so the startup report includes them
+STARTUP_T0 = time.perf_counter()
+
+import calendar
 import datetime
 from datetime import timezone
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import json
+import logging
 import os
 import datetime
-import csv
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import queue
+import threading
+from app_settings import load_settings, save_settings
+from csv_import import ImportWorker
+from login_background import background_key, load_background
+from perf import TRACER, LagMonitor, StallWatchdog, span, traced
+from persistence import WriteBehind
+from view_manager import ViewManager
+from storage import open_storage, new_user_record
+from user_model import UserModel
+from virtual_table import VirtualTable
+from workout import parse_workout
+from workout_store import WorkoutStore, QueryResults
 
 
 # App Constants
 # ---------------------------
 APP_NAME = "Markyle Fitness Tracker"
-DATA_FILE = "users.json"
-SETTINGS_FILE = "settings.json"
 
-DEFAULT_SETTINGS = {
-    "dark_mode": True,
-    "sidebar_collapsed": False
+WORKOUT_TYPES = [
+    "Running",
+    "Cycling",
+    "Swimming",
+    "Weight Training",
+    "Yoga",
+    "Pilates",
+    "CrossFit",
+    "Boxing",
+    "Dancing",
+    "Walking",
+    "Hiking",
+    "Rowing",
+    "Jump Rope",
+    "Elliptical",
+    "Aerobics",
+    "Sports (Basketball, Soccer, etc.)",
+    "Stretching",
+    "HIIT",
+    "Other"
+]
+
+WORKOUT_ICONS = {
+    "Running": "🏃",
+    "Cycling": "🚴",
+    "Swimming": "🏊",
+    "Weight Training": "🏋️",
+    "Yoga": "🧘",
+    "Pilates": "🤸",
+    "CrossFit": "💪",
+    "Boxing": "🥊",
+    "Dancing": "💃",
+    "Walking": "🚶",
+    "Hiking": "🥾",
+    "Rowing": "🚣",
+    "Jump Rope": "🪢",
+    "Elliptical": "🎯",
+    "Aerobics": "🤾",
+    "Sports (Basketball, Soccer, etc.)": "⚽",
+    "Stretching": "🤸",
+    "HIIT": "⚡",
 }
 
+# Rejected CSV rows listed in the import summary; the rest are only counted
+MAX_REPORTED_ERRORS = 10
 
+# Spans listed in the performance panel, and how often it refreshes
+PERF_PANEL_ROWS = 100
+PERF_PANEL_REFRESH_MS = 500
 
-# Data Utilities
-# ---------------------------
-def load_settings():
-    if not os.path.exists(SETTINGS_FILE):
-        return DEFAULT_SETTINGS.copy()
-    try:
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            s = json.load(f)
-            out = DEFAULT_SETTINGS.copy()
-            out.update(s)
-            return out
-    except:
-        return DEFAULT_SETTINGS.copy()
+log = logging.getLogger("fitness_tracker")
+startup_log = logging.getLogger("perf.startup")
 
 
-def save_settings(s):
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(s, f, indent=2)
+
+# Data Utilities
+# ---------------------------
+def load_charting():
+    """Import the chart module, and with it matplotlib, on first use; most sessions never open Analytics"""
+    import charts
+    return charts
 
 
-def load_data():
-    if not os.path.exists(DATA_FILE):
-        return {}
+def warm_up_charting():
+    """Pre-import the charting stack on a background thread"""
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return {}
+        load_charting()
+    except Exception:
+        # Charts will fail again when opened; record why now
+        log.warning("Could not load the charting libraries", exc_info=True)
 
 
-def save_data(data):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+# Startup Timing
+# ---------------------------
+class StartupTimer:
+    """Collects time-to-interactive milestones, in ms since STARTUP_T0.
+
+    The report is logged at INFO level on the "perf.startup" logger,
+    which configure_logging only shows when FITNESS_STARTUP_LOG is set;
+    the report is also appended to that file as one JSON line per launch.
+    """
+
+    def __init__(self, start=STARTUP_T0):
+        self.start = start
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, (time.perf_counter() - self.start) * 1000))
+
+    def report(self):
+        startup_log.info("Startup: %s", ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.marks))
+        path = os.environ.get("FITNESS_STARTUP_LOG")
+        if path:
+            record = {"at": datetime.datetime.now().isoformat(timespec="seconds")}
+            record.update((name, round(ms, 1)) for name, ms in self.marks)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+def configure_logging():
+    """Log warnings (stall reports among them) to stderr, and to FITNESS_LOG if it is set.
+
+    Setting FITNESS_STARTUP_LOG turns on startup timing, so the startup
+    report is logged at INFO as well.
+    """
+    handlers = [logging.StreamHandler()]
+    path = os.environ.get("FITNESS_LOG")
+    if path:
+        handlers.append(logging.FileHandler(path, encoding="utf-8"))
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=handlers
+    )
+    if os.environ.get("FITNESS_STARTUP_LOG"):
+        startup_log.setLevel(logging.INFO)
 
 
 class FitnessTrackerApp:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
         self.root = root
+        self.startup = startup
         self.root.title(APP_NAME)
 
         # Set window size to 80% of screen
@@ -74,14 +166,74 @@ class FitnessTrackerApp:
 
         self.root.bind('<F11>', lambda e: self.toggle_fullscreen())
         self.root.bind('<Escape>', lambda e: self.exit_fullscreen())
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.is_fullscreen = False
-        self.data = load_data()
         self.settings = load_settings()
+        # Tracing is only on while the performance panel is, but switching
+        # it on here also records startup for a panel left open last time
+        TRACER.enabled = self.settings.get("performance_panel", False)
+        self.lag_monitor = LagMonitor(root, TRACER)
+        self.watchdog = StallWatchdog(root, TRACER, context=self.active_view)
+        self.perf_window = None
+        self.perf_panel_var = None
+        with span("startup:open_storage", "storage"):
+            self.storage = open_storage(self.settings.get("storage_backend", "sqlite"))
+        # Settings, profile and workout saves are written on its thread
+        self.writer = WriteBehind()
+        if self.startup:
+            self.startup.mark("storage")
         self.current_user = None
+        self.model = None
+        self.import_job = None
         self.is_logged_in = False
+        self.login_background = None
         self.dark_mode = self.settings.get("dark_mode", True)
         self.update_theme()
         self.show_login_screen()
+        if self.startup:
+            self.startup.mark("login screen")
+        self.root.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Runs once the login screen is up and the event loop is idle"""
+        # Started only now, so building the first screen is not a stall
+        self.watchdog.start()
+        if self.startup:
+            self.startup.mark("interactive")
+            self.startup.report()
+        if self.settings.get("warm_up_charts", True):
+            threading.Thread(target=warm_up_charting, daemon=True).start()
+        if self.settings.get("performance_panel", False):
+            self.show_perf_panel()
+
+    def on_close(self):
+        """Write queued saves before the window goes away"""
+        try:
+            self.writer.flush()
+        except Exception as e:
+            if not messagebox.askyesno(
+                "Unsaved Changes",
+                f"Some changes could not be saved:\n{e}\n\nQuit anyway?"
+            ):
+                return
+        self.writer.close()
+        self.storage.close()
+        self.root.destroy()
+
+    def save_app_settings(self):
+        """Queue a settings write; a run of toggles ends up as one write"""
+        self.writer.schedule("settings", dict(self.settings), lambda changes: save_settings(changes[-1]))
+
+    def active_view(self):
+        """The page on screen, for stall reports; read from the watchdog's thread"""
+        if not self.is_logged_in:
+            return "login"
+        views = getattr(self, "views", None)
+        return views.current if views else None
+
+    def get_user_data(self):
+        """Return the logged-in user's record from storage"""
+        return self.storage.get_user(self.current_user) or dict(new_user_record(), workouts=WorkoutStore())
 
     def update_theme(self):
         if self.dark_mode:
@@ -93,6 +245,8 @@ class FitnessTrackerApp:
             self.accent_hover = "#4f46e5"
             self.input_bg = "#2d3250"
             self.sidebar_bg = "#161b33"
+            # Calendar days with 1, 2 and 3+ workouts
+            self.density_colors = ["#14532d", "#15803d", "#22c55e"]
         else:
             self.bg_color = "#f8fafc"
             self.panel_color = "#ffffff"
@@ -102,6 +256,7 @@ class FitnessTrackerApp:
             self.accent_hover = "#4f46e5"
             self.input_bg = "#f1f5f9"
             self.sidebar_bg = "#ffffff"
+            self.density_colors = ["#bbf7d0", "#4ade80", "#16a34a"]
         self.root.configure(bg=self.bg_color)
 
     def create_brand_text(self, parent):
@@ -146,18 +301,9 @@ class FitnessTrackerApp:
         main_frame = tk.Frame(self.root, bg=self.bg_color)
         main_frame.pack(fill="both", expand=True)
 
-        try:
-            from PIL import Image, ImageTk, ImageFilter, ImageEnhance
-            bg_image = Image.open("gym_background.jpg")
-            w, h = self.root.winfo_screenwidth(), self.root.winfo_screenheight()
-            bg_image = bg_image.resize((w, h), Image.LANCZOS).filter(ImageFilter.GaussianBlur(3))
-            bg_image = ImageEnhance.Brightness(bg_image).enhance(0.3)
-            bg_photo = ImageTk.PhotoImage(bg_image)
-            bg_label = tk.Label(main_frame, image=bg_photo)
-            bg_label.image = bg_photo
-            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-        except:
-            pass
+        # Paint the form first; the background photo (and PIL) follow one
+        # idle round later, after Tk has drawn the form
+        self.root.after_idle(lambda: self.root.after_idle(lambda: self.draw_login_background(main_frame)))
 
         login_frame = tk.Frame(main_frame, bg=self.panel_color, padx=50, pady=40)
         login_frame.place(relx=0.5, rely=0.5, anchor="center")
@@ -207,6 +353,24 @@ class FitnessTrackerApp:
 
         self.password_entry.bind("<Return>", lambda e: self.login())
 
+    def draw_login_background(self, frame):
+        """Put the blurred gym photo behind the login form"""
+        if not frame.winfo_exists():
+            return
+        try:
+            from PIL import ImageTk
+            key = background_key((self.root.winfo_screenwidth(), self.root.winfo_screenheight()))
+            # The PhotoImage is kept too, so logging out reuses it as is
+            if self.login_background is None or self.login_background[0] != key:
+                self.login_background = (key, ImageTk.PhotoImage(load_background(key)))
+            bg_photo = self.login_background[1]
+            bg_label = tk.Label(frame, image=bg_photo, borderwidth=0)
+            bg_label.image = bg_photo
+            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
+            bg_label.lower()
+        except Exception:
+            pass
+
     def show_register_screen(self):
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -261,6 +425,7 @@ class FitnessTrackerApp:
         else:
             self.password_entry.config(show="●")
 
+    @traced("login")
     def login(self):
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
@@ -269,8 +434,7 @@ class FitnessTrackerApp:
             messagebox.showerror("Error", "Please enter username and password")
             return
 
-        user = self.data.get(username)
-        if not user or user.get("password") != password:
+        if not self.storage.check_password(username, password):
             messagebox.showerror("Login Failed", "Invalid credentials")
             return
 
@@ -286,6 +450,7 @@ class FitnessTrackerApp:
         self.show_dashboard()
         self.toggle_sidebar()
 
+    @traced("register")
     def register(self):
         username = self.reg_username.get().strip()
         password = self.reg_password.get().strip()
@@ -295,7 +460,7 @@ class FitnessTrackerApp:
             messagebox.showerror("Error", "All fields are required")
             return
 
-        if username in self.data:
+        if self.storage.user_exists(username):
             messagebox.showerror("Error", "Username already exists")
             return
 
@@ -303,17 +468,11 @@ class FitnessTrackerApp:
             messagebox.showerror("Error", "Passwords do not match")
             return
 
-        self.data[username] = {
-            "password": password,
-            "profile": {},
-            "workouts": [],
-            "settings": {}
-        }
-
-        save_data(self.data)
+        self.storage.create_user(username, password)
         messagebox.showinfo("Success", "Account created successfully!")
         self.show_login_screen()
 
+    @traced("show_dashboard")
     def show_dashboard(self):
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -365,6 +524,16 @@ class FitnessTrackerApp:
         self.content_frame = tk.Frame(content_wrapper, bg=self.bg_color)
         self.content_frame.pack(fill="both", expand=True)
 
+        self.model = UserModel(self.storage, self.current_user, self.writer)
+
+        # Pages are built on first visit and kept until logout
+        self.views = ViewManager(self.content_frame, bg=self.bg_color)
+        self.views.register("dashboard", self.build_dashboard_content)
+        self.views.register("profile", self.build_profile_content)
+        self.views.register("workouts", self.build_workouts_content)
+        self.views.register("settings", self.build_settings_content)
+        self.dashboard_date = None
+
         self.show_dashboard_content()
 
     def create_sidebar(self, parent):
@@ -465,20 +634,10 @@ class FitnessTrackerApp:
             self.sidebar.pack(side="left", fill="y", before=self.main_container.winfo_children()[1])
             self.sidebar_visible = True
 
+    @traced("refresh_content")
     def refresh_content(self):
-        self.data = load_data()
-
-        for i, btn in enumerate(self.nav_buttons):
-            if btn.cget("bg") == self.accent_color:
-                if i == 0:
-                    self.show_dashboard_content()
-                elif i == 1:
-                    self.show_profile_content()
-                elif i == 2:
-                    self.show_workouts_content()
-                elif i == 3:
-                    self.show_settings_content()
-                break
+        """Re-read the user's data; pages showing it refresh themselves"""
+        self.model.reload()
 
     def highlight_nav_button(self, index):
         for i, btn in enumerate(self.nav_buttons):
@@ -487,10 +646,6 @@ class FitnessTrackerApp:
             else:
                 btn.config(bg=self.sidebar_bg, fg=self.muted_text)
 
-    def clear_content(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-
     def animate_fade_in(self, widget, alpha=0.0):
         pass
 
@@ -512,9 +667,13 @@ class FitnessTrackerApp:
 
     def show_dashboard_content(self):
         self.highlight_nav_button(0)
-        self.clear_content()
+        # After midnight the cards still show yesterday
+        if self.dashboard_date != datetime.date.today().isoformat():
+            self.views.invalidate("dashboard")
+        self.views.show("dashboard")
 
-        container = tk.Frame(self.content_frame, bg=self.bg_color)
+    def build_dashboard_content(self, parent):
+        container = tk.Frame(parent, bg=self.bg_color)
         container.pack(fill="both", expand=True, padx=40, pady=30)
 
         title_frame = tk.Frame(container, bg=self.bg_color)
@@ -540,21 +699,14 @@ class FitnessTrackerApp:
         stats_frame = tk.Frame(container, bg=self.bg_color)
         stats_frame.pack(fill="x", pady=20)
 
-        workouts = self.data.get(self.current_user, {}).get("workouts", [])
-        import datetime as dt
-        today = dt.date.today().isoformat()
-        today_workouts = [w for w in workouts if w.get("date") == today]
-
-        total_mins = sum(w.get("duration_min", 0) for w in today_workouts)
-        total_cal = sum(w.get("calories", 0) for w in today_workouts)
-
         stats = [
-            ("Total Workouts", str(len(today_workouts)), "#3b82f6", "🏃"),
-            ("Total Minutes", str(total_mins), "#10b981", "⏱️"),
-            ("Calories Burned", str(total_cal), "#f59e0b", "🔥")
+            ("Total Workouts", "#3b82f6", "🏃"),
+            ("Total Minutes", "#10b981", "⏱️"),
+            ("Calories Burned", "#f59e0b", "🔥")
         ]
 
-        for title_text, value, color, icon in stats:
+        stat_labels = []
+        for title_text, color, icon in stats:
             card = tk.Frame(stats_frame, bg=self.panel_color, relief="flat", bd=0)
             card.pack(side="left", padx=(0, 20), ipadx=30, ipady=20)
 
@@ -566,13 +718,15 @@ class FitnessTrackerApp:
                 fg=color
             ).pack(pady=(0, 5))
 
-            tk.Label(
+            value_label = tk.Label(
                 card,
-                text=value,
+                text="0",
                 font=("Segoe UI", 32, "bold"),
                 bg=self.panel_color,
                 fg=color
-            ).pack()
+            )
+            value_label.pack()
+            stat_labels.append(value_label)
 
             tk.Label(
                 card,
@@ -626,10 +780,48 @@ class FitnessTrackerApp:
 
         # Enable mouse wheel scrolling
         def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+            # The binding is global, so skip it while another page is shown
+            if canvas.winfo_ismapped():
+                canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
 
         canvas.bind_all("<MouseWheel>", _on_mousewheel)
 
+        def show_totals(totals):
+            for label, value in zip(stat_labels, totals):
+                label.config(text=str(value))
+
+        def update():
+            workouts = self.model.workouts
+            today = datetime.date.today().isoformat()
+            self.dashboard_date = today
+            show_totals(workouts.rollups.get("day", today))
+            for widget in scrollable_frame.winfo_children():
+                widget.destroy()
+            self.draw_today_workouts(scrollable_frame, workouts.on_date(today))
+
+        def on_workouts_added(added):
+            # Only today's workouts show here: bump the totals and append cards
+            today = self.dashboard_date
+            new = [w for w in added if w.get("date") == today]
+            if not new:
+                return
+            totals = self.model.workouts.rollups.get("day", today)
+            show_totals(totals)
+            if totals[0] == len(new):
+                # These are the first today, so the empty state goes
+                for widget in scrollable_frame.winfo_children():
+                    widget.destroy()
+            for workout in new:
+                self.draw_workout_card(scrollable_frame, workout)
+
+        self.model.subscribe("workouts_added", on_workouts_added)
+        self.model.subscribe("reloaded", lambda: self.views.invalidate("dashboard"))
+
+        update()
+        return update
+
+    def draw_today_workouts(self, scrollable_frame, today_workouts):
+        """Fill the Today's Activity list"""
         if not today_workouts:
             empty_state = tk.Frame(scrollable_frame, bg=self.panel_color)
             empty_state.pack(fill="both", expand=True, pady=30)
@@ -659,63 +851,47 @@ class FitnessTrackerApp:
             ).pack(pady=(5, 20))
         else:
             for workout in today_workouts:
-                workout_card = tk.Frame(scrollable_frame, bg=self.input_bg)
-                workout_card.pack(fill="x", pady=5)
-
-                icon_map = {
-                    "Running": "🏃",
-                    "Cycling": "🚴",
-                    "Swimming": "🏊",
-                    "Weight Training": "🏋️",
-                    "Yoga": "🧘",
-                    "Pilates": "🤸",
-                    "CrossFit": "💪",
-                    "Boxing": "🥊",
-                    "Dancing": "💃",
-                    "Walking": "🚶",
-                    "Hiking": "🥾",
-                    "Rowing": "🚣",
-                    "Jump Rope": "🪢",
-                    "Elliptical": "🎯",
-                    "Aerobics": "🤾",
-                    "Sports (Basketball, Soccer, etc.)": "⚽",
-                    "Stretching": "🤸",
-                    "HIIT": "⚡",
-                }
-                workout_icon = icon_map.get(workout.get("type", ""), "🏃")
-
-                icon_label = tk.Label(
-                    workout_card,
-                    text=workout_icon,
-                    font=("Segoe UI", 36),
-                    bg=self.input_bg
-                )
-                icon_label.pack(side="left", padx=15, pady=10)
-
-                info_frame = tk.Frame(workout_card, bg=self.input_bg)
-                info_frame.pack(side="left", padx=5, pady=10)
-
-                tk.Label(
-                    info_frame,
-                    text=workout.get("type", "Workout"),
-                    font=("Segoe UI", 14, "bold"),
-                    bg=self.input_bg,
-                    fg=self.text_color
-                ).pack(anchor="w")
-
-                tk.Label(
-                    info_frame,
-                    text=f"⏱️ {workout.get('duration_min', 0)} min • 🔥 {workout.get('calories', 0)} kcal",
-                    font=("Segoe UI", 10),
-                    bg=self.input_bg,
-                    fg=self.muted_text
-                ).pack(anchor="w")
+                self.draw_workout_card(scrollable_frame, workout)
+
+    def draw_workout_card(self, parent, workout):
+        workout_card = tk.Frame(parent, bg=self.input_bg)
+        workout_card.pack(fill="x", pady=5)
+
+        workout_icon = WORKOUT_ICONS.get(workout.get("type", ""), "🏃")
+
+        icon_label = tk.Label(
+            workout_card,
+            text=workout_icon,
+            font=("Segoe UI", 36),
+            bg=self.input_bg
+        )
+        icon_label.pack(side="left", padx=15, pady=10)
+
+        info_frame = tk.Frame(workout_card, bg=self.input_bg)
+        info_frame.pack(side="left", padx=5, pady=10)
+
+        tk.Label(
+            info_frame,
+            text=workout.get("type", "Workout"),
+            font=("Segoe UI", 14, "bold"),
+            bg=self.input_bg,
+            fg=self.text_color
+        ).pack(anchor="w")
+
+        tk.Label(
+            info_frame,
+            text=f"⏱️ {workout.get('duration_min', 0)} min • 🔥 {workout.get('calories', 0)} kcal",
+            font=("Segoe UI", 10),
+            bg=self.input_bg,
+            fg=self.muted_text
+        ).pack(anchor="w")
 
     def show_profile_content(self):
         self.highlight_nav_button(1)
-        self.clear_content()
+        self.views.show("profile")
 
-        container = tk.Frame(self.content_frame, bg=self.bg_color)
+    def build_profile_content(self, parent):
+        container = tk.Frame(parent, bg=self.bg_color)
         container.pack(fill="both", expand=True, padx=40, pady=30)
 
         # Title with icon
@@ -761,8 +937,6 @@ class FitnessTrackerApp:
         labels = ["Name", "Age", "Weight (kg)", "Height (cm)", "Daily Calorie Goal"]
         self.profile_entries = {}
 
-        profile = self.data.get(self.current_user, {}).get("profile", {})
-
         for i, label in enumerate(labels):
             tk.Label(
                 form_container,
@@ -782,7 +956,6 @@ class FitnessTrackerApp:
                 relief="flat"
             )
             entry.grid(row=i, column=1, padx=10, pady=10, sticky="w")
-            entry.insert(0, profile.get(label.lower().replace(" ", "_"), ""))
             self.profile_entries[label] = entry
 
         # Save button
@@ -802,6 +975,19 @@ class FitnessTrackerApp:
         )
         save_btn.pack(pady=20)
 
+        def update(profile=None):
+            profile = profile if profile is not None else self.model.profile
+            for label, entry in self.profile_entries.items():
+                entry.delete(0, tk.END)
+                entry.insert(0, profile.get(label.lower().replace(" ", "_"), ""))
+
+        self.model.subscribe("profile_changed", update)
+        self.model.subscribe("reloaded", lambda: self.views.invalidate("profile"))
+
+        update()
+        return update
+
+    @traced("save_profile")
     def save_profile(self):
         if not self.current_user:
             return
@@ -811,15 +997,15 @@ class FitnessTrackerApp:
             key = label.lower().replace(" ", "_")
             profile[key] = entry.get().strip()
 
-        self.data[self.current_user]["profile"] = profile
-        save_data(self.data)
+        self.model.save_profile(profile)
         messagebox.showinfo("Success", "Profile saved successfully!")
 
     def show_workouts_content(self):
         self.highlight_nav_button(2)
-        self.clear_content()
+        self.views.show("workouts")
 
-        container = tk.Frame(self.content_frame, bg=self.bg_color)
+    def build_workouts_content(self, parent):
+        container = tk.Frame(parent, bg=self.bg_color)
         container.pack(fill="both", expand=True, padx=40, pady=30)
 
         # Title with icon
@@ -900,27 +1086,6 @@ class FitnessTrackerApp:
             fg=self.text_color
         ).grid(row=1, column=0, sticky="w", padx=10, pady=10)
 
-        workout_types = [
-            "Running",
-            "Cycling",
-            "Swimming",
-            "Weight Training",
-            "Yoga",
-            "Pilates",
-            "CrossFit",
-            "Boxing",
-            "Dancing",
-            "Walking",
-            "Hiking",
-            "Rowing",
-            "Jump Rope",
-            "Elliptical",
-            "Aerobics",
-            "Sports (Basketball, Soccer, etc.)",
-            "Stretching",
-            "HIIT",
-            "Other"
-        ]
 
         type_frame = tk.Frame(form_container, bg=self.panel_color)
         type_frame.grid(row=1, column=1, padx=10, pady=10, sticky="w")
@@ -929,7 +1094,7 @@ class FitnessTrackerApp:
         self.workout_type = ttk.Combobox(
             type_frame,
             textvariable=self.workout_type_var,
-            values=workout_types,
+            values=WORKOUT_TYPES,
             font=("Segoe UI", 11),
             width=28,
             state="readonly"
@@ -1033,65 +1198,26 @@ class FitnessTrackerApp:
         )
         view_btn.pack(side="left", padx=5)
 
+    @traced("save_workout")
     def save_workout(self):
         try:
-            date = self.workout_date.get().strip()
             workout_type = self.workout_type_var.get().strip()
-            duration_str = self.workout_duration.get().strip()
-            calories_str = self.workout_calories.get().strip()
-            notes = self.workout_notes.get().strip()
-
-            # Validation
-            if not workout_type or workout_type == "Select workout type":
-                messagebox.showerror("Error", "Please select a workout type")
-                return
-
-            if not duration_str:
-                messagebox.showerror("Error", "Duration is required")
-                return
-
-            if not calories_str:
-                messagebox.showerror("Error", "Calories is required")
-                return
-
             try:
-                duration = int(duration_str)
-                calories = int(calories_str)
-            except ValueError:
-                messagebox.showerror("Error", "Duration and calories must be valid numbers")
-                return
-
-            if duration <= 0:
-                messagebox.showerror("Error", "Duration must be greater than 0")
-                return
-
-            if calories < 0:
-                messagebox.showerror("Error", "Calories cannot be negative")
+                workout = parse_workout({
+                    "date": self.workout_date.get(),
+                    "type": "" if workout_type == "Select workout type" else workout_type,
+                    "duration_min": self.workout_duration.get(),
+                    "calories": self.workout_calories.get(),
+                    "notes": self.workout_notes.get().strip()
+                }, require_calories=True)
+            except ValueError as e:
+                messagebox.showerror("Error", f"Please check the workout: {e}")
                 return
 
-            workout = {
-                "date": date,
-                "type": workout_type,
-                "duration_min": duration,
-                "calories": calories,
-                "notes": notes,
-                "created_at": datetime.datetime.utcnow().isoformat()
-            }
-
-            self.data.setdefault(self.current_user, {
-                "password": "",
-                "profile": {},
-                "workouts": [],
-                "settings": {}
-            })
-            self.data[self.current_user].setdefault("workouts", []).append(workout)
-
-            save_data(self.data)
+            # Subscribed widgets pick the new workout up from the event
+            self.model.add_workout(workout)
             messagebox.showinfo("Success", "Workout saved successfully!")
 
-            # Animate success feedback
-            self.refresh_content()
-
             # Clear fields
             self.workout_type.set("Select workout type")
             self.workout_duration.delete(0, tk.END)
@@ -1103,11 +1229,12 @@ class FitnessTrackerApp:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save workout: {str(e)}")
 
+    @traced("show_history")
     def show_history(self):
         """Show workout history in a new window"""
         history_window = tk.Toplevel(self.root)
         history_window.title("Workout History")
-        history_window.geometry("800x500")
+        history_window.geometry("900x620")
         history_window.configure(bg=self.bg_color)
 
         title = tk.Label(
@@ -1117,37 +1244,197 @@ class FitnessTrackerApp:
             bg=self.bg_color,
             fg=self.text_color
         )
-        title.pack(pady=20)
+        title.pack(pady=(20, 10))
+
+        workouts = self.get_user_data()["workouts"]
+        columns = [("date", "Date"), ("type", "Type"), ("duration", "Duration"),
+                   ("calories", "Calories"), ("notes", "Notes")]
+        fields = {"date": "date", "type": "type", "duration": "duration_min",
+                  "calories": "calories", "notes": "notes"}
+        sort = {"column": "date", "descending": True}
+        view = {"filters": None, "results": None}
+
+        # Filters
+        filter_frame = tk.Frame(history_window, bg=self.bg_color)
+        filter_frame.pack(fill="x", padx=20)
+
+        def filter_entry(row, column, label, width=12):
+            tk.Label(
+                filter_frame,
+                text=label,
+                font=("Segoe UI", 9),
+                bg=self.bg_color,
+                fg=self.muted_text
+            ).grid(row=row, column=column, sticky="w", padx=(0, 5), pady=3)
+            entry = tk.Entry(
+                filter_frame,
+                font=("Segoe UI", 10),
+                bg=self.input_bg,
+                fg=self.text_color,
+                insertbackground=self.text_color,
+                width=width,
+                relief="flat"
+            )
+            entry.grid(row=row, column=column + 1, sticky="w", padx=(0, 15), pady=3)
+            entry.bind("<Return>", lambda e: apply_filters())
+            return entry
+
+        date_from = filter_entry(0, 0, "From")
+        date_to = filter_entry(0, 2, "To")
+        min_duration = filter_entry(1, 0, "Min minutes")
+        max_duration = filter_entry(1, 2, "Max minutes")
+        min_calories = filter_entry(2, 0, "Min calories")
+        max_calories = filter_entry(2, 2, "Max calories")
+        note = filter_entry(1, 4, "Notes", width=18)
+
+        tk.Label(
+            filter_frame,
+            text="Type",
+            font=("Segoe UI", 9),
+            bg=self.bg_color,
+            fg=self.muted_text
+        ).grid(row=0, column=4, sticky="w", padx=(0, 5), pady=3)
+        type_var = tk.StringVar(value="All types")
+        ttk.Combobox(
+            filter_frame,
+            textvariable=type_var,
+            values=["All types"] + WORKOUT_TYPES,
+            font=("Segoe UI", 10),
+            width=16,
+            state="readonly"
+        ).grid(row=0, column=5, sticky="w", pady=3)
+
+        filter_btns = tk.Frame(filter_frame, bg=self.bg_color)
+        filter_btns.grid(row=2, column=4, columnspan=2, sticky="w", pady=3)
+
+        tk.Button(
+            filter_btns,
+            text="Apply",
+            font=("Segoe UI", 9),
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.accent_hover,
+            activeforeground="white",
+            relief="flat",
+            cursor="hand2",
+            command=lambda: apply_filters(),
+            padx=12
+        ).pack(side="left", padx=(0, 5))
 
-        # Treeview
-        tree_frame = tk.Frame(history_window, bg=self.bg_color)
-        tree_frame.pack(fill="both", expand=True, padx=20, pady=10)
+        tk.Button(
+            filter_btns,
+            text="Clear",
+            font=("Segoe UI", 9),
+            bg=self.input_bg,
+            fg=self.text_color,
+            activebackground=self.muted_text,
+            activeforeground=self.text_color,
+            relief="flat",
+            cursor="hand2",
+            command=lambda: clear_filters(),
+            padx=12
+        ).pack(side="left")
 
-        tree = ttk.Treeview(
-            tree_frame,
-            columns=("date", "type", "duration", "calories", "notes"),
-            show="headings",
-            height=15
+        result_label = tk.Label(
+            history_window,
+            text="",
+            font=("Segoe UI", 9),
+            bg=self.bg_color,
+            fg=self.muted_text
         )
+        result_label.pack(anchor="w", padx=20, pady=(5, 0))
+
+        def read_filters():
+            filters = {}
+            for key, entry in (("date_from", date_from), ("date_to", date_to)):
+                value = entry.get().strip()
+                if value:
+                    try:
+                        datetime.date.fromisoformat(value)
+                    except ValueError:
+                        raise ValueError("Dates must be in YYYY-MM-DD format")
+                    filters[key] = value
+            for key, entry in (("min_duration", min_duration), ("max_duration", max_duration),
+                               ("min_calories", min_calories), ("max_calories", max_calories)):
+                value = entry.get().strip()
+                if value:
+                    try:
+                        filters[key] = int(value)
+                    except ValueError:
+                        raise ValueError("Minutes and calories must be whole numbers")
+            if type_var.get() != "All types":
+                filters["workout_type"] = type_var.get()
+            if note.get().strip():
+                filters["note"] = note.get().strip()
+            return filters or None
+
+        def run_query(reset=True):
+            if view["filters"] is None:
+                view["results"] = None
+            else:
+                view["results"] = QueryResults(
+                    workouts,
+                    sort_by=fields[sort["column"]],
+                    descending=sort["descending"],
+                    **view["filters"]
+                )
+            table.refresh(reset=reset)
 
-        for col in ("date", "type", "duration", "calories", "notes"):
-            tree.heading(col, text=col.capitalize())
-            tree.column(col, anchor="center", width=120)
+        def apply_filters():
+            try:
+                view["filters"] = read_filters()
+            except ValueError as e:
+                messagebox.showerror("Invalid Filter", str(e), parent=history_window)
+                return
+            run_query()
+
+        def clear_filters():
+            for entry in (date_from, date_to, min_duration, max_duration, min_calories, max_calories, note):
+                entry.delete(0, tk.END)
+            type_var.set("All types")
+            view["filters"] = None
+            run_query()
+
+        # Treeview - only the visible rows are ever created, so opening
+        # and scrolling stay fast however long the history is
+        def fetch(start, stop):
+            results = view["results"]
+            if results is None:
+                rows = workouts.page(start, stop, fields[sort["column"]], sort["descending"])
+                result_label.config(text=f"{len(workouts)} workouts")
+            else:
+                rows = results.rows(start, stop)
+                more = "" if results.exhausted else "+"
+                result_label.config(text=f"{len(results)}{more} matching workouts")
+            return [
+                (
+                    workout.get("date", ""),
+                    workout.get("type", ""),
+                    f"{workout.get('duration_min', 0)} min",
+                    workout.get("calories", 0),
+                    workout.get("notes", "")
+                )
+                for workout in rows
+            ]
 
-        tree.pack(fill="both", expand=True)
+        def count():
+            results = view["results"]
+            return len(workouts) if results is None else len(results)
 
-        # Load workouts
-        workouts = self.data.get(self.current_user, {}).get("workouts", [])
-        sorted_workouts = sorted(workouts, key=lambda x: x.get("date", ""), reverse=True)
+        def sort_by(column):
+            if sort["column"] == column:
+                sort["descending"] = not sort["descending"]
+            else:
+                sort["column"] = column
+                sort["descending"] = column == "date"
+            for col, text in columns:
+                arrow = (" ▼" if sort["descending"] else " ▲") if col == sort["column"] else ""
+                table.heading(col, text + arrow)
+            run_query()
 
-        for workout in sorted_workouts:
-            tree.insert("", "end", values=(
-                workout.get("date", ""),
-                workout.get("type", ""),
-                f"{workout.get('duration_min', 0)} min",
-                workout.get("calories", 0),
-                workout.get("notes", "")
-            ))
+        table = VirtualTable(history_window, columns, fetch, count, on_heading=sort_by, bg=self.bg_color)
+        table.pack(fill="both", expand=True, padx=20, pady=10)
+        table.heading("date", "Date ▼")
 
         # Export button
         btn_frame = tk.Frame(history_window, bg=self.bg_color)
@@ -1185,11 +1472,30 @@ class FitnessTrackerApp:
         )
         done_btn.pack(side="left", padx=5)
 
+        # New workouts show up in place; a reload swaps in a fresh store
+        def on_reloaded():
+            nonlocal workouts
+            workouts = self.model.workouts
+            run_query()
+
+        unsubscribe = [
+            self.model.subscribe("workouts_added", lambda added: run_query(reset=False)),
+            self.model.subscribe("reloaded", on_reloaded)
+        ]
+
+        def on_destroy(event):
+            if event.widget is history_window:
+                for stop in unsubscribe:
+                    stop()
+
+        history_window.bind("<Destroy>", on_destroy)
+
     def show_settings_content(self):
         self.highlight_nav_button(3)
-        self.clear_content()
+        self.views.show("settings")
 
-        container = tk.Frame(self.content_frame, bg=self.bg_color)
+    def build_settings_content(self, parent):
+        container = tk.Frame(parent, bg=self.bg_color)
         container.pack(fill="both", expand=True, padx=40, pady=30)
 
         # Title with icon
@@ -1310,19 +1616,160 @@ class FitnessTrackerApp:
         )
         charts_btn.pack(anchor="w", pady=5)
 
+        # Developer tools
+        tk.Label(
+            settings_container,
+            text="Developer",
+            font=("Segoe UI", 16, "bold"),
+            bg=self.panel_color,
+            fg=self.text_color
+        ).pack(anchor="w", pady=(30, 10))
+
+        self.perf_panel_var = tk.BooleanVar(value=self.perf_window is not None)
+        perf_check = tk.Checkbutton(
+            settings_container,
+            text="Performance Panel (span timings and event-loop lag)",
+            variable=self.perf_panel_var,
+            command=lambda: self.set_performance_panel(self.perf_panel_var.get()),
+            font=("Segoe UI", 11),
+            bg=self.panel_color,
+            fg=self.text_color,
+            selectcolor=self.input_bg,
+            activebackground=self.panel_color,
+            activeforeground=self.text_color
+        )
+        perf_check.pack(anchor="w", pady=5)
+
     def toggle_dark_mode(self, value):
         self.dark_mode = value
         self.settings["dark_mode"] = value
-        save_settings(self.settings)
+        self.save_app_settings()
         self.update_theme()
         messagebox.showinfo("Theme Changed", "Please restart the app to apply theme changes")
 
+    def set_performance_panel(self, enabled):
+        self.settings["performance_panel"] = enabled
+        self.save_app_settings()
+        if enabled:
+            self.show_perf_panel()
+        else:
+            self.close_perf_panel()
+
+    def show_perf_panel(self):
+        """Recent span timings and event-loop lag; tracing only runs while this is open"""
+        if self.perf_window is not None and self.perf_window.winfo_exists():
+            self.perf_window.lift()
+            return
+
+        TRACER.enabled = True
+        self.lag_monitor.start()
+
+        perf_window = tk.Toplevel(self.root)
+        perf_window.title("Performance")
+        perf_window.geometry("680x520")
+        perf_window.configure(bg=self.bg_color)
+        perf_window.protocol("WM_DELETE_WINDOW", lambda: self.set_performance_panel(False))
+        self.perf_window = perf_window
+
+        lag_label = tk.Label(
+            perf_window,
+            text="",
+            font=("Segoe UI", 11),
+            bg=self.bg_color,
+            fg=self.text_color,
+            anchor="w"
+        )
+        lag_label.pack(fill="x", padx=20, pady=(15, 5))
+
+        columns = [("name", "Span", 300), ("ms", "ms", 90), ("thread", "Thread", 130), ("ago", "Seconds Ago", 100)]
+        tree = ttk.Treeview(perf_window, columns=[c for c, _, _ in columns], show="headings", height=16)
+        for col, text, width in columns:
+            tree.heading(col, text=text)
+            tree.column(col, width=width, anchor="w" if col == "name" else "e")
+        tree.pack(fill="both", expand=True, padx=20, pady=5)
+        # A fixed pool of rows, rewritten on every refresh
+        rows = [tree.insert("", "end", values=()) for _ in range(PERF_PANEL_ROWS)]
+
+        btn_frame = tk.Frame(perf_window, bg=self.bg_color)
+        btn_frame.pack(pady=10)
+
+        for text, command in (("Export Chrome Trace", self.export_trace), ("Clear", TRACER.clear)):
+            tk.Button(
+                btn_frame,
+                text=text,
+                font=("Segoe UI", 11),
+                bg=self.accent_color,
+                fg="white",
+                activebackground=self.accent_hover,
+                activeforeground="white",
+                relief="flat",
+                cursor="hand2",
+                command=command,
+                padx=20,
+                pady=8
+            ).pack(side="left", padx=5)
+
+        def refresh():
+            if self.perf_window is not perf_window:
+                return
+            last, p50, p99, worst = self.lag_monitor.stats()
+            lag_label.config(
+                text=f"Event-loop lag: {last:.1f} ms now, p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {worst:.1f} ms"
+                     f" · {self.watchdog.stalls} stalls"
+            )
+            threads = {thread.ident: thread.name for thread in threading.enumerate()}
+            now = time.perf_counter_ns()
+            spans = TRACER.recent("X", PERF_PANEL_ROWS)
+            for i, row in enumerate(rows):
+                if i < len(spans):
+                    _, name, _, start, duration, tid, _ = spans[i]
+                    values = (name, f"{duration / 1e6:.2f}", threads.get(tid, tid), f"{(now - start - duration) / 1e9:.1f}")
+                else:
+                    values = ()
+                tree.item(row, values=values)
+            perf_window.after(PERF_PANEL_REFRESH_MS, refresh)
+
+        refresh()
+
+    def close_perf_panel(self):
+        TRACER.enabled = False
+        self.lag_monitor.stop()
+        if self.perf_window is not None:
+            if self.perf_window.winfo_exists():
+                self.perf_window.destroy()
+            self.perf_window = None
+        if self.perf_panel_var is not None:
+            self.perf_panel_var.set(False)
+
+    def export_trace(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.perf_window,
+            title="Save trace as Chrome trace JSON",
+            defaultextension=".json",
+            initialfile=f"fitness_trace_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+
+        if not path:
+            return
+
+        try:
+            TRACER.export_chrome_trace(path)
+            messagebox.showinfo(
+                "Trace Exported",
+                f"Open it in chrome://tracing or ui.perfetto.dev:\n{path}",
+                parent=self.perf_window
+            )
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export trace: {str(e)}", parent=self.perf_window)
+
+    @traced("export_csv")
     def export_csv(self):
         if not self.current_user:
             messagebox.showerror("Error", "Please login first")
             return
 
-        workouts = self.data.get(self.current_user, {}).get("workouts", [])
+        workouts = self.get_user_data()["workouts"]
 
         if not workouts:
             messagebox.showinfo("No Data", "No workouts to export")
@@ -1340,16 +1787,12 @@ class FitnessTrackerApp:
             return
 
         try:
-            with open(path, "w", newline="", encoding="utf-8") as f:
-                fieldnames = ["date", "type", "duration_min", "calories", "notes", "created_at"]
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(workouts)
-
-            messagebox.showinfo("Success", f"Exported {len(workouts)} workouts to:\n{path}")
+            count = self.model.export_csv(path)
+            messagebox.showinfo("Success", f"Exported {count} workouts to:\n{path}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export: {str(e)}")
 
+    @traced("import_csv")
     def import_csv(self):
         if not self.current_user:
             messagebox.showerror("Error", "Please login first")
@@ -1363,34 +1806,124 @@ class FitnessTrackerApp:
         if not path:
             return
 
+        if self.import_job is not None:
+            messagebox.showinfo("Import Running", "Please wait for the current import to finish")
+            return
+
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title("Importing Workouts")
+        progress_window.geometry("420x150")
+        progress_window.configure(bg=self.bg_color)
+        progress_window.resizable(False, False)
+
+        status = tk.Label(
+            progress_window,
+            text="Reading CSV...",
+            font=("Segoe UI", 11),
+            bg=self.bg_color,
+            fg=self.text_color
+        )
+        status.pack(pady=(25, 10))
+
+        bar = ttk.Progressbar(progress_window, mode="determinate", maximum=100, length=360)
+        bar.pack(pady=5)
+
+        worker = ImportWorker(path)
+        self.import_job = {
+            "worker": worker,
+            "model": self.model,
+            "window": progress_window,
+            "status": status,
+            "bar": bar,
+            "imported": 0,
+            "error_count": 0,
+            "errors": [],
+            "failure": None
+        }
+        progress_window.protocol("WM_DELETE_WINDOW", worker.cancel)
+        worker.start()
+        self.root.after(50, self.poll_import, self.import_job)
+
+    def stop_import(self):
+        """Cancel a running import and close its window; uncommitted batches are dropped"""
+        job = self.import_job
+        if job is None:
+            return
+        self.import_job = None
+        job["worker"].cancel()
+        if job["window"].winfo_exists():
+            job["window"].destroy()
+
+    def poll_import(self, job):
+        """Commit parsed batches from the import worker, one per event-loop tick"""
+        if job is not self.import_job or not job["window"].winfo_exists():
+            # Stopped by logout, or its window went with the page it was on
+            job["worker"].cancel()
+            if job is self.import_job:
+                self.import_job = None
+            return
+        worker = job["worker"]
         try:
-            imported = 0
-            with open(path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-
-                for row in reader:
-                    workout = {
-                        "date": row.get("date", ""),
-                        "type": row.get("type", ""),
-                        "duration_min": int(row.get("duration_min", 0)),
-                        "calories": int(row.get("calories", 0)),
-                        "notes": row.get("notes", ""),
-                        "created_at": row.get("created_at", datetime.datetime.utcnow().isoformat())
-                    }
-
-                    self.data[self.current_user].setdefault("workouts", []).append(workout)
-                    imported += 1
-
-            save_data(self.data)
-            messagebox.showinfo("Success", f"Imported {imported} workouts successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to import: {str(e)}")
+            message = worker.queue.get_nowait()
+        except queue.Empty:
+            if worker.cancelled.is_set() and not worker.is_alive():
+                message = ("done",)
+            else:
+                self.root.after(50, self.poll_import, job)
+                return
 
+        kind = message[0]
+        if kind == "batch":
+            _, workouts, errors, bytes_read, total_bytes = message
+            if worker.cancelled.is_set():
+                # Batches parsed before Cancel are dropped, not committed
+                self.root.after(1, self.poll_import, job)
+                return
+            try:
+                if workouts:
+                    with span("import:commit_batch", "ui", rows=len(workouts)):
+                        job["model"].add_workouts(workouts)
+                    job["imported"] += len(workouts)
+            except Exception as e:
+                job["failure"] = str(e)
+                worker.cancel()
+            job["error_count"] += len(errors)
+            job["errors"].extend(errors[:MAX_REPORTED_ERRORS - len(job["errors"])])
+            job["bar"]["value"] = 100 * bytes_read / total_bytes if total_bytes else 100
+            job["status"].config(text=f"Imported {job['imported']} workouts, skipped {job['error_count']} rows")
+            self.root.after(1, self.poll_import, job)
+            return
+
+        if kind == "error":
+            job["failure"] = message[1]
+            self.root.after(1, self.poll_import, job)
+            return
+
+        # done
+        self.import_job = None
+        if job["window"].winfo_exists():
+            job["window"].destroy()
+
+        summary = f"Imported {job['imported']} workouts."
+        if job["error_count"]:
+            lines = [f"  line {line}: {error}" for line, error in job["errors"]]
+            if job["error_count"] > len(lines):
+                lines.append(f"  ...and {job['error_count'] - len(lines)} more")
+            summary += f"\n\nSkipped {job['error_count']} invalid rows:\n" + "\n".join(lines)
+
+        if job["failure"]:
+            messagebox.showerror("Error", f"Failed to import: {job['failure']}\n\n{summary}")
+        elif worker.cancelled.is_set():
+            messagebox.showinfo("Import Cancelled", summary)
+        else:
+            messagebox.showinfo("Success", summary)
+
+    @traced("show_charts")
     def show_charts(self):
         """Show charts in a new window"""
         charts_window = tk.Toplevel(self.root)
         charts_window.title("Analytics")
-        charts_window.geometry("900x600")
+        charts_window.geometry("1000x650")
         charts_window.configure(bg=self.bg_color)
 
         title = tk.Label(
@@ -1406,31 +1939,28 @@ class FitnessTrackerApp:
         btn_frame = tk.Frame(charts_window, bg=self.bg_color)
         btn_frame.pack(pady=10)
 
-        tk.Button(
-            btn_frame,
-            text="Weekly Calories",
-            font=("Segoe UI", 10),
-            bg=self.accent_color,
-            fg="white",
-            relief="flat",
-            cursor="hand2",
-            command=lambda: self.plot_weekly_calories(plot_area),
-            padx=15,
-            pady=5
-        ).pack(side="left", padx=5)
+        chart_buttons = [
+            ("Weekly Calories", self.plot_weekly_calories),
+            ("Duration Over Time", self.plot_duration),
+            ("Rolling Averages", self.plot_rolling_averages),
+            ("By Type", self.plot_type_breakdown),
+            ("Heatmap", self.plot_heatmap),
+            ("Calorie Goal", self.plot_goal_adherence)
+        ]
 
-        tk.Button(
-            btn_frame,
-            text="Duration Over Time",
-            font=("Segoe UI", 10),
-            bg=self.accent_color,
-            fg="white",
-            relief="flat",
-            cursor="hand2",
-            command=lambda: self.plot_duration(plot_area),
-            padx=15,
-            pady=5
-        ).pack(side="left", padx=5)
+        for text, plot in chart_buttons:
+            tk.Button(
+                btn_frame,
+                text=text,
+                font=("Segoe UI", 10),
+                bg=self.accent_color,
+                fg="white",
+                relief="flat",
+                cursor="hand2",
+                command=lambda plot=plot: plot(chart),
+                padx=12,
+                pady=5
+            ).pack(side="left", padx=4)
 
         tk.Button(
             btn_frame,
@@ -1445,88 +1975,301 @@ class FitnessTrackerApp:
             pady=5
         ).pack(side="left", padx=5)
 
-        # Plot area
+        # Plot area - one figure and canvas for the window's lifetime
         plot_area = tk.Frame(charts_window, bg=self.bg_color)
         plot_area.pack(fill="both", expand=True, padx=20, pady=10)
+        chart = load_charting().ChartView(plot_area, bg=self.panel_color, fg=self.text_color)
+
+        def on_destroy(event):
+            if event.widget is charts_window:
+                chart.close()
+
+        charts_window.bind("<Destroy>", on_destroy)
 
         # Show weekly calories by default
-        self.plot_weekly_calories(plot_area)
+        self.plot_weekly_calories(chart)
+
+    def render_chart(self, chart, prepare, apply, name="chart"):
+        """Compute and rasterize a chart on a worker thread; the Tk thread only blits it.
+
+        prepare() runs first and its result is passed to apply(), which
+        updates the chart's artists. Both run off the Tk thread, so they
+        must not touch Tk widgets.
+        """
+        job = chart.start(prepare, apply, name)
+        # Fast charts finish before the spinner is ever shown
+        self.root.after(30, lambda: self.poll_chart(chart, job))
+
+    def poll_chart(self, chart, job):
+        if job is not chart.job:
+            # Superseded by another chart, or the window was closed
+            return
+        if not job.done.is_set():
+            chart.spin()
+            self.root.after(80, lambda: self.poll_chart(chart, job))
+            return
+        error = chart.finish(job)
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to draw chart: {error}", parent=chart.widget)
 
-    def plot_weekly_calories(self, plot_area):
-        # Clear plot area
-        for widget in plot_area.winfo_children():
-            widget.destroy()
+    def show_chart_message(self, chart, text):
+        self.render_chart(chart, lambda: None, lambda data: chart.show_message(text), "message")
 
-        workouts = self.data.get(self.current_user, {}).get("workouts", [])
+    @traced("plot_weekly_calories")
+    def plot_weekly_calories(self, chart):
+        workouts = self.get_user_data()["workouts"]
 
         if not workouts:
-            tk.Label(
-                plot_area,
-                text="No data available",
-                font=("Segoe UI", 12),
-                bg=self.bg_color,
-                fg=self.muted_text
-            ).pack(pady=50)
+            self.show_chart_message(chart, "No data available")
             return
 
+        analytics = workouts.analytics
         today = datetime.date.today()
         days = [(today - datetime.timedelta(days=i)) for i in reversed(range(7))]
         labels = [d.strftime("%a") for d in days]
-        totals = []
-
-        for d in days:
-            ds = d.isoformat()
-            total = sum(w.get("calories", 0) for w in workouts if w.get("date") == ds)
-            totals.append(total)
-
-        fig, ax = plt.subplots(figsize=(8, 5))
-        ax.bar(labels, totals, color=self.accent_color)
-        ax.set_title("Last 7 Days - Calories Burned", fontsize=14, fontweight="bold")
-        ax.set_ylabel("Calories (kcal)")
-        ax.grid(axis="y", linestyle="--", alpha=0.3)
-
-        canvas = FigureCanvasTkAgg(fig, master=plot_area)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
-
-    def plot_duration(self, plot_area):
-        # Clear plot area
-        for widget in plot_area.winfo_children():
-            widget.destroy()
 
-        workouts = self.data.get(self.current_user, {}).get("workouts", [])
+        def prepare():
+            return analytics.daily_totals("calories", days[0], days[-1]).tolist()
+
+        def apply(totals):
+            ax, created = chart.axes("weekly_calories")
+            if created:
+                ax.bar(range(7), totals, color=self.accent_color)
+                ax.set_title("Last 7 Days - Calories Burned", fontsize=14, fontweight="bold")
+                ax.set_ylabel("Calories (kcal)")
+                ax.grid(axis="y", linestyle="--", alpha=0.3)
+            else:
+                for bar, total in zip(ax.patches, totals):
+                    bar.set_height(total)
+                ax.relim()
+                ax.autoscale_view()
+            ax.set_xticks(range(7), labels)
+
+        self.render_chart(chart, prepare, apply, "weekly_calories")
+
+    @traced("plot_duration")
+    def plot_duration(self, chart):
+        workouts = self.get_user_data()["workouts"]
 
         if not workouts:
-            tk.Label(
-                plot_area,
-                text="No data available",
-                font=("Segoe UI", 12),
-                bg=self.bg_color,
-                fg=self.muted_text
-            ).pack(pady=50)
+            self.show_chart_message(chart, "No data available")
             return
 
-        sorted_workouts = sorted(workouts, key=lambda x: x.get("date", ""))
-        dates = [w.get("date", "") for w in sorted_workouts]
-        durations = [w.get("duration_min", 0) for w in sorted_workouts]
+        analytics = workouts.analytics
+        charts = load_charting()
 
-        fig, ax = plt.subplots(figsize=(8, 5))
-        ax.plot(range(len(durations)), durations, marker="o", color=self.accent_color, linewidth=2)
-        ax.set_xticks(range(len(dates)))
-        ax.set_xticklabels(dates, rotation=45, ha="right")
-        ax.set_title("Workout Duration Over Time", fontsize=14, fontweight="bold")
-        ax.set_ylabel("Duration (minutes)")
-        ax.grid(axis="y", linestyle="--", alpha=0.3)
+        def prepare():
+            from analytics import minutes_by_period
+            # Per-period totals, never more than a few hundred points
+            return minutes_by_period(analytics)
 
-        canvas = FigureCanvasTkAgg(fig, master=plot_area)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        def apply(series):
+            period, dates, minutes = series
+            if not len(dates):
+                chart.show_message("No dated workouts to plot")
+                return
+
+            ax, created = chart.axes("duration")
+            if created:
+                ax.plot(dates, minutes, color=self.accent_color, linewidth=2)
+                ax.set_title("Workout Duration Over Time", fontsize=14, fontweight="bold")
+                ax.grid(axis="y", linestyle="--", alpha=0.3)
+                locator = charts.AutoDateLocator()
+                ax.xaxis.set_major_locator(locator)
+                ax.xaxis.set_major_formatter(charts.ConciseDateFormatter(locator))
+            else:
+                ax.lines[0].set_data(dates, minutes)
+                ax.relim()
+                ax.autoscale_view()
+            # Markers only while the points are far enough apart to read
+            ax.lines[0].set_marker("o" if len(dates) <= 60 else "")
+            ax.set_ylabel(f"Minutes per {period}")
+
+        self.render_chart(chart, prepare, apply, "duration")
+
+    @traced("plot_rolling_averages")
+    def plot_rolling_averages(self, chart):
+        workouts = self.get_user_data()["workouts"]
+
+        if not workouts:
+            self.show_chart_message(chart, "No data available")
+            return
+
+        analytics = workouts.analytics
+        charts = load_charting()
+        today = datetime.date.today()
+        start = today - datetime.timedelta(days=364)
+        fields = [("calories", "Calories (kcal)"), ("duration_min", "Minutes")]
+        windows = [(7, self.accent_color), (30, "#f59e0b")]
+
+        def prepare():
+            return [
+                [analytics.rolling_mean(field, window, start, today) for window, _ in windows]
+                for field, _ in fields
+            ]
+
+        def apply(series):
+            axes, created = chart.axes("rolling", rows=2)
+            for ax, (_, label), field_series in zip(axes, fields, series):
+                for i, ((window, color), (days, means)) in enumerate(zip(windows, field_series)):
+                    if created:
+                        ax.plot(days, means, color=color, linewidth=2 if window == 7 else 2.5,
+                                label=f"{window}-day average")
+                    else:
+                        ax.lines[i].set_data(days, means)
+                if created:
+                    ax.set_ylabel(label)
+                    ax.grid(axis="y", linestyle="--", alpha=0.3)
+                    ax.legend(loc="upper left", fontsize=9)
+                else:
+                    ax.relim()
+                    ax.autoscale_view()
+
+            if created:
+                axes[0].set_title("Rolling Averages - Last 12 Months", fontsize=14, fontweight="bold")
+                locator = charts.AutoDateLocator()
+                axes[1].xaxis.set_major_locator(locator)
+                axes[1].xaxis.set_major_formatter(charts.ConciseDateFormatter(locator))
+                axes[0].tick_params(labelbottom=False)
+
+        self.render_chart(chart, prepare, apply, "rolling_averages")
+
+    @traced("plot_type_breakdown")
+    def plot_type_breakdown(self, chart):
+        workouts = self.get_user_data()["workouts"]
+
+        if not workouts:
+            self.show_chart_message(chart, "No data available")
+            return
+
+        analytics = workouts.analytics
+
+        def prepare():
+            from analytics import type_totals
+            types, counts, minutes = type_totals(analytics)
+            # Reversed, so barh puts the biggest type at the top
+            return minutes[::-1], [f"{t} ({c})" for t, c in zip(types[::-1], counts[::-1])]
+
+        def apply(data):
+            minutes, labels = data
+            ax, created = chart.axes("types")
+            if created:
+                # Leave room on the left for the type names
+                ax.set_position([0.35, 0.1, 0.6, 0.8])
+                ax.set_title("Minutes by Workout Type", fontsize=14, fontweight="bold")
+                ax.set_xlabel("Total minutes")
+                ax.grid(axis="x", linestyle="--", alpha=0.3)
+            # The set of types can change, so the bars are replaced rather than updated
+            for bars in list(ax.containers):
+                bars.remove()
+            ax.barh(range(len(labels)), minutes, color=self.accent_color)
+            ax.set_yticks(range(len(labels)), labels)
+            ax.relim()
+            ax.autoscale_view()
+
+        self.render_chart(chart, prepare, apply, "type_breakdown")
+
+    @traced("plot_heatmap")
+    def plot_heatmap(self, chart):
+        workouts = self.get_user_data()["workouts"]
+
+        if not workouts:
+            self.show_chart_message(chart, "No data available")
+            return
+
+        analytics = workouts.analytics
+        today = datetime.date.today()
+
+        def prepare():
+            from analytics import year_grid
+            # 7 x 53 cells sliced straight out of the cached daily totals
+            return year_grid(analytics, today)
+
+        def apply(data):
+            grid, peak, month_ticks = data
+            ax, created = chart.axes("heatmap")
+            if created:
+                ax.imshow(grid, cmap="Greens", aspect="equal", interpolation="nearest")
+                ax.set_title("Active Minutes - Last 12 Months", fontsize=14, fontweight="bold")
+                ax.set_yticks(range(7), ["Mon", "", "Wed", "", "Fri", "", "Sun"])
+                ax.tick_params(length=0)
+                for spine in ax.spines.values():
+                    spine.set_visible(False)
+            image = ax.images[0]
+            image.set_data(grid)
+            image.set_clim(0, max(peak, 1))
+            ax.set_xticks([column for column, _ in month_ticks], [label for _, label in month_ticks])
+            ax.xaxis.tick_top()
+
+        self.render_chart(chart, prepare, apply, "heatmap")
+
+    @traced("plot_goal_adherence")
+    def plot_goal_adherence(self, chart):
+        workouts = self.get_user_data()["workouts"]
+
+        if not workouts:
+            self.show_chart_message(chart, "No data available")
+            return
+
+        try:
+            goal = float(self.get_user_data()["profile"].get("daily_calorie_goal") or 0)
+        except (TypeError, ValueError):
+            goal = 0
+        if goal <= 0:
+            self.show_chart_message(chart, "Set a Daily Calorie Goal in your profile to track it here")
+            return
+
+        analytics = workouts.analytics
+        today = datetime.date.today()
+        days = [today - datetime.timedelta(days=i) for i in reversed(range(30))]
+
+        def prepare():
+            totals = analytics.daily_totals("calories", days[0], today)
+            return totals, totals >= goal
+
+        def apply(data):
+            totals, met = data
+            colors = ["#10b981" if hit else self.muted_text for hit in met]
+            ax, created = chart.axes("goal")
+            if created:
+                ax.bar(range(30), totals, color=colors)
+                ax.axhline(goal, color="#ef4444", linestyle="--", linewidth=1.5)
+                ax.set_ylabel("Calories (kcal)")
+                ax.grid(axis="y", linestyle="--", alpha=0.3)
+            else:
+                for bar, total, color in zip(ax.patches, totals, colors):
+                    bar.set_height(total)
+                    bar.set_color(color)
+                ax.lines[0].set_ydata([goal, goal])
+            ax.set_ylim(0, max(totals.max(), goal) * 1.15)
+            ax.set_xticks(range(0, 30, 5), [days[i].strftime("%b %d") for i in range(0, 30, 5)])
+            ax.set_title(
+                f"Daily Calorie Goal ({goal:g} kcal) - met on {met.sum()} of 30 days",
+                fontsize=14,
+                fontweight="bold"
+            )
 
+        self.render_chart(chart, prepare, apply, "goal_adherence")
+
+    @traced("logout")
     def logout(self):
+        # Batches the import has not committed yet are dropped with it
+        self.stop_import()
+        try:
+            self.model.flush()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save your changes, so you are still logged in:\n{e}")
+            return
+        # The pages are about to be destroyed, so stop sending them events
+        self.model.close()
+        self.model = None
+        # Drop the account's data so memory only ever holds the open account
+        self.storage.release_user(self.current_user)
         self.current_user = None
         self.is_logged_in = False
         self.show_login_screen()
 
+    @traced("open_calendar")
     def open_calendar(self, entry_widget):
         # Check if calendar window already exists
         if hasattr(self, 'cal_window') and self.cal_window.winfo_exists():
@@ -1589,10 +2332,33 @@ class FitnessTrackerApp:
         )
         next_btn.pack(side="right")
 
-        # Calendar grid
+        # Calendar grid - built once as 7x6 cells; draw_calendar only
+        # reconfigures them when the month or selection changes
         self.cal_frame = tk.Frame(self.cal_window, bg=self.panel_color)
         self.cal_frame.pack(padx=10, pady=5)
 
+        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+        for i, day in enumerate(days):
+            tk.Label(
+                self.cal_frame,
+                text=day,
+                font=("Segoe UI", 9, "bold"),
+                bg=self.panel_color,
+                fg=self.muted_text,
+                width=5
+            ).grid(row=0, column=i, padx=2, pady=2)
+
+        self.cal_buttons = []
+        for cell in range(42):
+            btn = tk.Button(
+                self.cal_frame,
+                font=("Segoe UI", 9),
+                relief="flat",
+                width=5
+            )
+            btn.grid(row=cell // 7 + 1, column=cell % 7, padx=2, pady=2)
+            self.cal_buttons.append(btn)
+
         self.draw_calendar(entry_widget)
 
         # Bottom buttons
@@ -1642,71 +2408,55 @@ class FitnessTrackerApp:
         cancel_btn.pack(side="left", padx=5)
 
     def draw_calendar(self, entry_widget):
-        """Draw the calendar grid"""
-        # Clear existing calendar
-        for widget in self.cal_frame.winfo_children():
-            widget.destroy()
-
-        # Day headers
-        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        for i, day in enumerate(days):
-            tk.Label(
-                self.cal_frame,
-                text=day,
-                font=("Segoe UI", 9, "bold"),
-                bg=self.panel_color,
-                fg=self.muted_text,
-                width=5
-            ).grid(row=0, column=i, padx=2, pady=2)
-
-        # Get calendar for month
-        import calendar
-        cal = calendar.monthcalendar(self.cal_year, self.cal_month)
-
+        """Show the current month in the calendar grid"""
+        # Weeks start on Monday; cells before the 1st and after the last day stay blank
+        first_weekday, month_length = calendar.monthrange(self.cal_year, self.cal_month)
         today = datetime.date.today()
-
-        # Draw dates
-        for week_num, week in enumerate(cal, start=1):
-            for day_num, day in enumerate(week):
-                if day == 0:
-                    # Empty cell
-                    tk.Label(
-                        self.cal_frame,
-                        text="",
-                        bg=self.panel_color,
-                        width=5
-                    ).grid(row=week_num, column=day_num, padx=2, pady=2)
-                else:
-                    date_obj = datetime.date(self.cal_year, self.cal_month, day)
-                    is_today = (date_obj == today)
-                    is_selected = (date_obj == self.cal_selected_date)
-
-                    # Determine button color
-                    if is_selected:
-                        bg_color = self.accent_color
-                        fg_color = "white"
-                        font_weight = "bold"
-                    elif is_today:
-                        bg_color = "#60a5fa"  # Lighter blue for today
-                        fg_color = "white"
-                        font_weight = "bold"
-                    else:
-                        bg_color = self.input_bg
-                        fg_color = self.text_color
-                        font_weight = "normal"
-
-                    btn = tk.Button(
-                        self.cal_frame,
-                        text=str(day),
-                        font=("Segoe UI", 9, font_weight),
-                        bg=bg_color,
-                        fg=fg_color,
-                        relief="flat",
-                        cursor="hand2",
-                        command=lambda d=day: self.select_date(d, entry_widget),
-                        width=5
-                    )
-                    btn.grid(row=week_num, column=day_num, padx=2, pady=2)
+        # Workout counts come from the day rollups, already filed by month
+        workout_days = self.get_user_data()["workouts"].rollups.month_days(self.cal_year, self.cal_month)
+
+        for cell, btn in enumerate(self.cal_buttons):
+            day = cell - first_weekday + 1
+            if not 1 <= day <= month_length:
+                btn.config(
+                    text="",
+                    bg=self.panel_color,
+                    activebackground=self.panel_color,
+                    cursor="",
+                    command=""
+                )
+                continue
+
+            date_obj = datetime.date(self.cal_year, self.cal_month, day)
+            count = workout_days.get(date_obj.isoformat(), (0,))[0]
+
+            # Determine button color
+            if date_obj == self.cal_selected_date:
+                bg_color = self.accent_color
+                fg_color = "white"
+                font_weight = "bold"
+            elif date_obj == today:
+                bg_color = "#60a5fa"  # Lighter blue for today
+                fg_color = "white"
+                font_weight = "bold"
+            elif count:
+                bg_color = self.density_colors[min(count, 3) - 1]
+                fg_color = "white" if self.dark_mode or count > 1 else self.text_color
+                font_weight = "normal"
+            else:
+                bg_color = self.input_bg
+                fg_color = self.text_color
+                font_weight = "normal"
+
+            btn.config(
+                text=str(day),
+                font=("Segoe UI", 9, font_weight),
+                bg=bg_color,
+                fg=fg_color,
+                activebackground=bg_color,
+                cursor="hand2",
+                command=lambda d=day: self.select_date(d, entry_widget)
+            )
 
     def change_month(self, delta, cal_window, entry_widget):
         """Change the displayed month"""
@@ -1752,11 +2502,9 @@ class FitnessTrackerApp:
 
 
 if __name__ == "__main__":
-    try:
-        plt.switch_backend("TkAgg")
-    except:
-        pass
-
+    startup = StartupTimer()
+    startup.mark("imports")
+    configure_logging()
     root = tk.Tk()
-    app = FitnessTrackerApp(root)
+    app = FitnessTrackerApp(root, startup)
     root.mainloop()
\ No newline at end of file
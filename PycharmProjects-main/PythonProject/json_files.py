@@ -0,0 +1,82 @@
+import json
+import logging
+import os
+
+from perf import span
+
+
+log = logging.getLogger("storage")
+
+
+def _fsync_dir(path):
+    """Make a rename in path's directory durable; Windows has no directory fsync"""
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _keep_backup(path):
+    """Make the current file <path>.bak without copying it"""
+    backup = path + ".bak"
+    if os.path.exists(backup):
+        os.remove(backup)
+    try:
+        # A hard link keeps path in place until the new file replaces it
+        os.link(path, backup)
+    except OSError:
+        # No hard links on this filesystem; a crash before the new file
+        # lands then leaves only the backup, which read_json falls back to
+        os.replace(path, backup)
+
+
+def write_json_atomic(path, obj):
+    """Write obj to path through a temp file so readers never see half a file.
+
+    The file being replaced becomes <path>.bak, the last known good copy
+    read_json recovers from, without its contents being written again.
+    """
+    tmp_path = path + ".tmp"
+    with span("storage:write_json", "storage", file=os.path.basename(path)):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            _keep_backup(path)
+        os.replace(tmp_path, path)
+        _fsync_dir(path)
+
+
+def read_json(path, default=None, move_damaged=True):
+    """Load a file written by write_json_atomic, recovering from its backup.
+
+    Every file the app keeps is a JSON object, so one that does not parse
+    or holds anything else is damaged. A damaged file is renamed to
+    <path>.corrupt, so the next write does not rotate it over the good
+    backup; readers that must leave files alone pass move_damaged=False.
+    Returns default when neither the file nor its backup can be read.
+    """
+    for candidate in (path, path + ".bak"):
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+            if not isinstance(obj, dict):
+                raise ValueError(f"expected a JSON object, found {type(obj).__name__}")
+        except OSError as e:
+            log.error("Could not read %s: %s", candidate, e)
+            continue
+        except ValueError as e:
+            log.error("%s is damaged: %s", candidate, e)
+            if move_damaged and candidate == path:
+                os.replace(path, path + ".corrupt")
+            continue
+        if candidate != path:
+            log.warning("Recovered %s from its backup", path)
+        return obj
+    return default
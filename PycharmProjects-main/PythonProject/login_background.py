@@ -0,0 +1,80 @@
+import glob
+import hashlib
+import os
+
+
+BACKGROUND_FILE = "gym_background.jpg"
+BACKGROUND_CACHE_DIR = "cache"
+BLUR_RADIUS = 3
+BRIGHTNESS = 0.3
+
+# Processed images kept on disk, one per display configuration
+MAX_CACHED_BACKGROUNDS = 4
+
+_processed = {}
+
+
+def background_key(size, source=BACKGROUND_FILE, blur=BLUR_RADIUS, brightness=BRIGHTNESS):
+    """Everything the processed image depends on; raises OSError if the photo is missing"""
+    return (os.path.abspath(source), os.stat(source).st_mtime_ns, tuple(size), blur, brightness)
+
+
+def _cache_path(key):
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(BACKGROUND_CACHE_DIR, f"login_background-{digest}.jpg")
+
+
+def _render(key):
+    from PIL import Image, ImageEnhance, ImageFilter
+    source, _, size, blur, brightness = key
+    with Image.open(source) as image:
+        image = image.convert("RGB").resize(size, Image.LANCZOS).filter(ImageFilter.GaussianBlur(blur))
+    return ImageEnhance.Brightness(image).enhance(brightness)
+
+
+def _read_cache(path, size):
+    from PIL import Image
+    try:
+        with Image.open(path) as cached:
+            image = cached.convert("RGB")
+    except OSError:
+        return None
+    return image if image.size == size else None
+
+
+def _write_cache(path, image):
+    """Best effort: a failed write only means rendering again next session"""
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(BACKGROUND_CACHE_DIR, exist_ok=True)
+        # The image is blurred, so JPEG loses nothing visible and loads
+        # several times faster than PNG
+        image.save(tmp, "JPEG", quality=95)
+        os.replace(tmp, path)
+    except OSError:
+        return
+    stale = sorted(glob.glob(os.path.join(BACKGROUND_CACHE_DIR, "login_background-*.jpg")),
+                   key=os.path.getmtime, reverse=True)
+    for old in stale[MAX_CACHED_BACKGROUNDS:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def load_background(key):
+    """The resized, blurred and dimmed login background for a key, as a PIL image.
+
+    Looked up in memory, then on disk; the resize/blur pipeline only runs
+    when neither has it, and its result is saved to both.
+    """
+    image = _processed.get(key)
+    if image is not None:
+        return image
+    path = _cache_path(key)
+    image = _read_cache(path, key[2])
+    if image is None:
+        image = _render(key)
+        _write_cache(path, image)
+    _processed[key] = image
+    return image
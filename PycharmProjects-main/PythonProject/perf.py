@@ -0,0 +1,319 @@
+import collections
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+
+# Spans and lag samples kept; older ones are dropped
+MAX_SPANS = 5000
+
+# How often the lag monitor's heartbeat is scheduled, in ms
+LAG_INTERVAL_MS = 100
+
+# The stall watchdog's heartbeat, how late it may fire before the loop
+# counts as stalled, and how long a stall runs before it is reported
+# without waiting for it to end
+STALL_INTERVAL_MS = 50
+STALL_THRESHOLD_MS = 250
+STALL_HANG_MS = 5000
+
+log = logging.getLogger("perf")
+
+# Names of the @traced calls running on the Tk thread, outermost first
+_actions = []
+
+
+class _NoSpan:
+    """What span() returns while tracing is off: entering and leaving it does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        # deque.append is atomic, so worker threads can record spans too
+        self.tracer.events.append(
+            ("X", self.name, self.category, self.start, end - self.start, threading.get_ident(), self.args)
+        )
+        return False
+
+
+class Tracer:
+    """Records timing spans and counters into a fixed-size ring buffer.
+
+    ``span(name)`` is a context manager timing its block. While
+    ``enabled`` is False it returns a shared no-op object, so leaving the
+    calls in the hot paths costs one attribute check each. Events are
+    ("X", name, category, start_ns, duration_ns, thread_id, args) for
+    spans and ("C", name, category, at_ns, value, thread_id, None) for
+    counters such as event-loop lag.
+    """
+
+    def __init__(self, max_events=MAX_SPANS):
+        self.enabled = False
+        self.events = collections.deque(maxlen=max_events)
+        self.origin = time.perf_counter_ns()
+
+    def span(self, name, category="app", **args):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, category, args or None)
+
+    def counter(self, name, value, category="app"):
+        if self.enabled:
+            self.events.append(("C", name, category, time.perf_counter_ns(), value, threading.get_ident(), None))
+
+    def clear(self):
+        self.events.clear()
+
+    def recent(self, kind="X", limit=None):
+        """The newest events of one kind, newest first"""
+        events = [event for event in list(self.events) if event[0] == kind]
+        events.reverse()
+        return events[:limit] if limit else events
+
+    def chrome_trace(self):
+        """The buffer as a Chrome trace (chrome://tracing, Perfetto) JSON object"""
+        pid = os.getpid()
+        trace = []
+        threads = {}
+        for kind, name, category, at, value, tid, args in list(self.events):
+            event = {"name": name, "cat": category, "ph": kind, "ts": (at - self.origin) / 1000, "pid": pid, "tid": tid}
+            if kind == "X":
+                event["dur"] = value / 1000
+                if args:
+                    event["args"] = {key: str(v) for key, v in args.items()}
+            else:
+                event["args"] = {name: value}
+            trace.append(event)
+            threads.setdefault(tid, None)
+
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for tid in threads:
+            trace.append({
+                "name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                "args": {"name": names.get(tid, f"thread {tid}")}
+            })
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class LagMonitor:
+    """Measures Tk event-loop lag with a root.after heartbeat.
+
+    Each beat is scheduled ``interval`` ms after the last one ran; the
+    lag is how much later than that it actually fired, which is how long
+    the loop was busy with something else. Samples go to the tracer as
+    "event_loop_lag_ms" counters and into ``samples`` for the panel.
+    """
+
+    def __init__(self, root, tracer, interval=LAG_INTERVAL_MS, history=600):
+        self.root = root
+        self.tracer = tracer
+        self.interval = interval
+        self.samples = collections.deque(maxlen=history)
+        self.after_id = None
+        self.due = None
+
+    @property
+    def running(self):
+        return self.after_id is not None
+
+    def start(self):
+        if self.after_id is None:
+            self._schedule()
+
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _schedule(self):
+        self.due = time.perf_counter() + self.interval / 1000
+        self.after_id = self.root.after(self.interval, self._beat)
+
+    def _beat(self):
+        lag_ms = max(0.0, (time.perf_counter() - self.due) * 1000)
+        self.samples.append(lag_ms)
+        self.tracer.counter("event_loop_lag_ms", round(lag_ms, 2), "tk")
+        self._schedule()
+
+    def stats(self):
+        """(last, p50, p99, max) lag in ms over the recent samples"""
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0, 0.0, 0.0, 0.0
+        n = len(samples)
+        return self.samples[-1], samples[n // 2], samples[min(n - 1, int(0.99 * n))], samples[-1]
+
+
+class StallWatchdog:
+    """Reports Tk callbacks that block the event loop for too long.
+
+    A root.after heartbeat stamps ``beat_at`` every ``interval`` ms and a
+    sampler thread checks the stamp. Once a beat is more than
+    ``threshold_ms`` overdue the loop is stuck in some callback, so the
+    sampler grabs the Tk thread's stack with sys._current_frames() while
+    it is still inside it. When the heartbeat resumes, the stall is logged
+    with its length, the stack, ``context()`` (the active view) and the
+    action: the @traced calls running at the time, or failing those the
+    Tk callback found on the stack. Stalls past STALL_HANG_MS are logged
+    straight away too, so a hang that never ends still gets reported.
+    """
+
+    def __init__(self, root, tracer, interval=STALL_INTERVAL_MS, threshold_ms=STALL_THRESHOLD_MS,
+                 hang_ms=STALL_HANG_MS, context=None):
+        self.root = root
+        self.tracer = tracer
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+        self.hang_ms = hang_ms
+        self.context = context
+        self.thread_id = threading.get_ident()
+        self.stalls = 0
+        self.beat_at = None
+        self.after_id = None
+        self.stopped = threading.Event()
+        self.sampler = None
+
+    @property
+    def running(self):
+        return self.after_id is not None
+
+    def start(self):
+        if self.after_id is not None:
+            return
+        self.stopped.clear()
+        self._beat()
+        self.sampler = threading.Thread(target=self._sample, daemon=True, name="stall-watchdog")
+        self.sampler.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _beat(self):
+        self.beat_at = time.perf_counter_ns()
+        self.after_id = self.root.after(self.interval, self._beat)
+
+    def _sample(self):
+        interval_ns = self.interval * 1_000_000
+        stall = None
+        while not self.stopped.wait(self.interval / 2000):
+            beat_at = self.beat_at
+            overdue_ms = (time.perf_counter_ns() - beat_at - interval_ns) / 1e6
+            if stall is None:
+                if overdue_ms > self.threshold_ms:
+                    stall = self._capture(beat_at + interval_ns)
+                    stall["beat_at"] = beat_at
+            elif beat_at != stall["beat_at"]:
+                self._finish(stall, (beat_at - stall["since"]) / 1e6)
+                stall = None
+            elif overdue_ms > self.hang_ms and not stall["logged"]:
+                stall["logged"] = True
+                log.warning(
+                    "Event loop stalled for %.0f ms so far in view %s during %s\n%s",
+                    overdue_ms, stall["view"], stall["action"], stall["stack"]
+                )
+
+    def _capture(self, since):
+        frame = sys._current_frames().get(self.thread_id)
+        view = None
+        if self.context:
+            try:
+                view = self.context()
+            except Exception:
+                pass
+        return {
+            "since": since,
+            "view": view or "-",
+            "action": " > ".join(_actions) or _tk_callback(frame) or "-",
+            "stack": "".join(traceback.format_stack(frame)).rstrip() if frame else "",
+            "logged": False
+        }
+
+    def _finish(self, stall, duration_ms):
+        self.stalls += 1
+        if self.tracer.enabled:
+            self.tracer.events.append((
+                "X", "stall", "tk", stall["since"], int(duration_ms * 1e6), self.thread_id,
+                {"view": stall["view"], "action": stall["action"]}
+            ))
+        if stall["logged"]:
+            log.warning("Event loop stall in view %s during %s ended after %.0f ms",
+                        stall["view"], stall["action"], duration_ms)
+        else:
+            log.warning(
+                "Event loop stalled for %.0f ms in view %s during %s\n%s",
+                duration_ms, stall["view"], stall["action"], stall["stack"]
+            )
+
+
+def _tk_callback(frame):
+    """Qualified name of the Tk callback a stack is running, if it is in one"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    in_tk = False
+    for frame in reversed(frames):
+        code = frame.f_code
+        if os.path.basename(os.path.dirname(code.co_filename)) == "tkinter":
+            in_tk = True
+        elif in_tk and code.co_filename != __file__:
+            return getattr(code, "co_qualname", code.co_name)
+    return None
+
+
+# The app-wide tracer; modules record into it with ``span``
+TRACER = Tracer()
+span = TRACER.span
+
+
+def traced(name, category="ui"):
+    """Decorator recording every call of a function as a span.
+
+    The name is also what StallWatchdog reports as the action while the
+    call runs, so only decorate functions called on the Tk thread.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _actions.append(name)
+            try:
+                with span(name, category):
+                    return func(*args, **kwargs)
+            finally:
+                _actions.pop()
+        return wrapper
+    return decorate
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+
+from perf import span
+
+
+# Seconds to wait after the last change before writing, the most a burst
+# of changes can hold a write back, and the wait before retrying a failure
+WRITE_DELAY = 0.5
+WRITE_MAX_DELAY = 2.0
+WRITE_RETRY_DELAY = 5.0
+
+log = logging.getLogger("storage")
+
+
+class WriteBehind:
+    """Writes changes on a background thread, coalescing bursts into one write.
+
+    ``schedule(key, change, write)`` queues a change for a target such as
+    the settings file or one account. Changes are values captured when
+    they are made (a settings copy, a journal record), so the write sees
+    a consistent snapshot whatever the UI does meanwhile. Once no change
+    has come in for ``delay`` seconds, or the oldest has waited
+    ``max_delay``, each target's ``write`` is called once with all of its
+    changes in order.
+
+    A failed write keeps its changes queued and is retried after
+    WRITE_RETRY_DELAY. ``flush`` writes everything queued on the calling
+    thread and raises the first error, so logout and window close can
+    tell the user about it.
+    """
+
+    def __init__(self, delay=WRITE_DELAY, max_delay=WRITE_MAX_DELAY):
+        self.delay = delay
+        self.max_delay = max_delay
+        self.cond = threading.Condition()
+        # key -> (write, [changes]); dicts keep the order keys were first queued
+        self.pending = {}
+        self.first_at = None
+        self.last_at = None
+        self.retry_at = 0.0
+        self.writing = False
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True, name="write-behind")
+        self.thread.start()
+
+    def schedule(self, key, change, write):
+        with self.cond:
+            entry = self.pending.get(key)
+            if entry is None:
+                self.pending[key] = (write, [change])
+            else:
+                entry[1].append(change)
+            self.last_at = time.monotonic()
+            if self.first_at is None:
+                self.first_at = self.last_at
+            self.cond.notify_all()
+
+    def flush(self):
+        """Write everything queued so far, now and on this thread"""
+        with self.cond:
+            while self.writing:
+                self.cond.wait()
+            batch = self._take()
+        error = self._write(batch)
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Stop the thread; flush first, or queued changes are dropped"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+
+    def _take(self):
+        batch = self.pending
+        self.pending = {}
+        self.first_at = None
+        self.writing = True
+        return batch
+
+    def _write(self, batch):
+        """Run one write per key; failed ones go back in the queue. Returns the first error"""
+        failed = {}
+        error = None
+        for key, (write, changes) in batch.items():
+            try:
+                with span("persist:write", "storage", key=key, changes=len(changes)):
+                    write(changes)
+            except Exception as e:
+                log.exception("Could not save %s", key)
+                failed[key] = (write, changes)
+                error = error or e
+
+        with self.cond:
+            self.writing = False
+            if failed:
+                # Older changes go first, ahead of any queued during the write
+                for key, (write, changes) in self.pending.items():
+                    if key in failed:
+                        failed[key][1].extend(changes)
+                    else:
+                        failed[key] = (write, changes)
+                self.pending = failed
+                self.first_at = self.last_at = time.monotonic()
+                self.retry_at = self.first_at + WRITE_RETRY_DELAY
+            self.cond.notify_all()
+        return error
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while True:
+                    if self.closed:
+                        return
+                    if self.pending and not self.writing:
+                        now = time.monotonic()
+                        due = max(min(self.last_at + self.delay, self.first_at + self.max_delay), self.retry_at)
+                        if now >= due:
+                            break
+                        self.cond.wait(due - now)
+                    else:
+                        self.cond.wait()
+                batch = self._take()
+            self._write(batch)
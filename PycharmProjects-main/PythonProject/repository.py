@@ -0,0 +1,59 @@
+from csv_export import export_workouts_csv
+from csv_import import IMPORT_BATCH_SIZE, iter_import_batches
+
+
+class WorkoutRepository:
+    """One account's workouts and profile in a storage backend.
+
+    This is the data access the app, the CLI and benchmarks share: reads
+    come from the backend's cached record, writes go straight through to
+    it, and CSV import/export stream a batch or a row at a time. It never
+    touches Tk; UserModel adds the change events the UI listens to.
+    """
+
+    def __init__(self, storage, username):
+        self.storage = storage
+        self.username = username
+
+    @property
+    def record(self):
+        return self.storage.get_user(self.username)
+
+    @property
+    def workouts(self):
+        return self.record["workouts"]
+
+    @property
+    def profile(self):
+        return self.record["profile"]
+
+    def iter_workouts(self):
+        """Workouts in date order, without loading the account where the backend allows"""
+        return self.storage.iter_workouts(self.username)
+
+    def add_workout(self, workout):
+        self.storage.add_workout(self.username, workout)
+
+    def add_workouts(self, workouts):
+        self.storage.add_workouts(self.username, workouts)
+
+    def save_profile(self, profile):
+        self.storage.save_profile(self.username, profile)
+
+    def reload(self):
+        self.storage.reload_user(self.username)
+
+    def import_csv(self, path, batch_size=IMPORT_BATCH_SIZE):
+        """Import a CSV one committed batch at a time.
+
+        Yields (imported, errors, bytes_read, total_bytes) after each
+        batch, errors being (line_number, message) for rejected rows.
+        """
+        for workouts, errors, bytes_read, total_bytes in iter_import_batches(path, batch_size):
+            if workouts:
+                self.add_workouts(workouts)
+            yield len(workouts), errors, bytes_read, total_bytes
+
+    def export_csv(self, path):
+        """Write every workout to a CSV file; returns how many were written"""
+        return export_workouts_csv(path, self.iter_workouts())
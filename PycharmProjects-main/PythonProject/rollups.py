@@ -0,0 +1,95 @@
+import datetime
+
+
+PERIODS = ("day", "week", "month", "type")
+
+EMPTY = (0, 0, 0)
+
+
+def rollup_keys(workout):
+    """The (period, key) buckets a workout counts towards"""
+    date = workout.get("date", "")
+    keys = [("day", date), ("type", workout.get("type", ""))]
+    try:
+        d = datetime.date.fromisoformat(date)
+    except ValueError:
+        # Free-text dates still get day and type totals
+        return keys
+    year, week, _ = d.isocalendar()
+    keys.append(("week", f"{year}-W{week:02d}"))
+    keys.append(("month", date[:7]))
+    return keys
+
+
+def rollup_deltas(workouts):
+    """Sum a batch of workouts into {(period, key): [count, minutes, calories]}"""
+    deltas = {}
+    for w in workouts:
+        minutes = w.get("duration_min", 0)
+        calories = w.get("calories", 0)
+        for key in rollup_keys(w):
+            totals = deltas.get(key)
+            if totals is None:
+                deltas[key] = [1, minutes, calories]
+            else:
+                totals[0] += 1
+                totals[1] += minutes
+                totals[2] += calories
+    return deltas
+
+
+class Rollups:
+    """Per-user workout count, minutes and calories by day, ISO week, month and type.
+
+    Day buckets are also filed by "YYYY-MM" month, sharing the same
+    totals lists, so a month's days are one lookup rather than a scan.
+    """
+
+    def __init__(self, tables=None):
+        self.tables = {period: {} for period in PERIODS}
+        for period, buckets in (tables or {}).items():
+            self.tables[period] = {key: list(totals) for key, totals in buckets.items()}
+        self.days_by_month = {}
+        for date, totals in self.tables["day"].items():
+            self.days_by_month.setdefault(date[:7], {})[date] = totals
+
+    def _bucket(self, period, key):
+        totals = self.tables[period].get(key)
+        if totals is None:
+            totals = self.tables[period][key] = [0, 0, 0]
+            if period == "day":
+                self.days_by_month.setdefault(key[:7], {})[key] = totals
+        return totals
+
+    def add(self, workout):
+        minutes = workout.get("duration_min", 0)
+        calories = workout.get("calories", 0)
+        for period, key in rollup_keys(workout):
+            totals = self._bucket(period, key)
+            totals[0] += 1
+            totals[1] += minutes
+            totals[2] += calories
+
+    def merge(self, deltas):
+        for (period, key), (count, minutes, calories) in deltas.items():
+            totals = self._bucket(period, key)
+            totals[0] += count
+            totals[1] += minutes
+            totals[2] += calories
+
+    def extend(self, workouts):
+        self.merge(rollup_deltas(workouts))
+
+    def get(self, period, key):
+        """(count, minutes, calories) for one bucket"""
+        return tuple(self.tables[period].get(key, EMPTY))
+
+    def month_days(self, year, month):
+        """{ISO date: [count, minutes, calories]} for the days of a month with workouts"""
+        return self.days_by_month.get(f"{year:04d}-{month:02d}", {})
+
+    def to_dict(self):
+        return {
+            period: {key: list(totals) for key, totals in buckets.items()}
+            for period, buckets in self.tables.items()
+        }
@@ -0,0 +1,756 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import urllib.parse
+
+from json_files import read_json, write_json_atomic
+from perf import span
+from rollups import Rollups, rollup_deltas
+from workout_store import WorkoutStore
+
+
+# Storage Constants
+# ---------------------------
+DATA_FILE = "users.json"
+USER_DATA_DIR = "user_data"
+DB_FILE = "mark_kyle_fitness.db"
+
+# Fold the journal back into the snapshot once it grows past this size
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+PASSWORD_ITERATIONS = 200_000
+
+# Profile form keys -> profiles table columns
+PROFILE_COLUMNS = {
+    "name": "name",
+    "age": "age",
+    "weight_(kg)": "weight_kg",
+    "height_(cm)": "height_cm",
+    "daily_calorie_goal": "daily_goal",
+    # Set by older versions of the app; kept so migrated accounts lose nothing
+    "activity": "activity",
+}
+
+# Profile columns stored as text; the rest are numbers
+TEXT_PROFILE_COLUMNS = ("name", "activity")
+
+# Profile keys written by older versions of the app
+LEGACY_PROFILE_KEYS = {
+    "weight": "weight_(kg)",
+    "height": "height_(cm)",
+    "goal": "daily_calorie_goal",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id INTEGER PRIMARY KEY,
+    height_cm REAL,
+    weight_kg REAL,
+    daily_goal INTEGER,
+    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS workouts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    duration_min INTEGER NOT NULL,
+    calories INTEGER,
+    notes TEXT,
+    created_at TEXT,
+    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    hhmm TEXT NOT NULL,
+    message TEXT NOT NULL,
+    active INTEGER DEFAULT 1,
+    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_workouts_user_date ON workouts(user_id, date);
+CREATE TABLE IF NOT EXISTS rollups (
+    user_id INTEGER NOT NULL,
+    period TEXT NOT NULL,
+    key TEXT NOT NULL,
+    workouts INTEGER NOT NULL DEFAULT 0,
+    minutes INTEGER NOT NULL DEFAULT 0,
+    calories INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY(user_id, period, key),
+    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+"""
+
+
+def new_user_record():
+    return {
+        "profile": {},
+        "workouts": [],
+        "settings": {}
+    }
+
+
+def hash_password(password, salt=None):
+    salt = salt or secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), PASSWORD_ITERATIONS)
+    return f"pbkdf2_sha256${PASSWORD_ITERATIONS}${salt}${digest.hex()}"
+
+
+def verify_password(password, stored):
+    try:
+        _, iterations, salt, digest = stored.split("$")
+        candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+def _to_number(value):
+    """Convert profile form text to a number for the typed profile columns"""
+    value = str(value).strip()
+    if not value:
+        return None
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _from_number(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+# JSON Backend
+# ---------------------------
+def _workout_from_row(w):
+    return {
+        "date": w["date"],
+        "type": w["type"],
+        "duration_min": w["duration_min"],
+        "calories": w["calories"] or 0,
+        "notes": w["notes"] or "",
+        "created_at": w["created_at"] or ""
+    }
+
+
+def _read_journal(path):
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn line left by a crash mid-append
+                continue
+
+
+def _number_workouts(workouts):
+    """Give id-less workouts (older files) stable ids; return the highest id"""
+    last = 0
+    for w in workouts:
+        if "id" not in w:
+            w["id"] = last + 1
+        last = max(last, w["id"])
+    return last
+
+
+def shard_path(data_dir, username):
+    """Where the JSON backend keeps one account's data"""
+    # The hash keeps "Mark" and "mark" apart on case-insensitive filesystems
+    digest = hashlib.sha1(username.encode("utf-8")).hexdigest()[:8]
+    readable = urllib.parse.quote(username, safe="")[:64]
+    return os.path.join(data_dir, f"{readable}-{digest}.json")
+
+
+def _is_monolith(data):
+    """True for an all-accounts users.json, as opposed to a credentials index"""
+    return any(set(entry) - {"password"} for entry in data.values())
+
+
+def _replay_monolith(data, legacy_journals):
+    """Apply an all-accounts users.json's journals to it in memory"""
+    last_ids = {}
+    for username, user in data.items():
+        last_ids[username] = _number_workouts(user.setdefault("workouts", []))
+    for path in legacy_journals:
+        for record in _read_journal(path):
+            username = record["user"]
+            if record["op"] == "create_user":
+                if username not in data:
+                    data[username] = dict(new_user_record(), password=record["password"])
+                    last_ids[username] = 0
+                continue
+            user = data.setdefault(username, new_user_record())
+            last_ids[username] = _apply_change(user, last_ids.get(username, 0), record)
+    return data
+
+
+def _load_shard(path, move_damaged=True):
+    """An account's snapshot with its journals replayed; returns (user, last workout id)"""
+    user = new_user_record()
+    user.update(read_json(path, {}, move_damaged))
+
+    last_id = _number_workouts(user["workouts"])
+    rollups = user.pop("rollups", None)
+    user["workouts"] = WorkoutStore(user["workouts"], Rollups(rollups) if rollups is not None else None)
+    for journal in (path + ".journal.compacting", path + ".journal"):
+        for record in _read_journal(journal):
+            last_id = _apply_change(user, last_id, record)
+    return user, last_id
+
+
+def read_legacy_users(path=DATA_FILE, data_dir=USER_DATA_DIR):
+    """Yield (username, record) for each account the JSON backend has on disk.
+
+    Reads either layout, an all-accounts users.json (plus any journal
+    left next to it) or a credentials index with per-account shards, and
+    never writes, moves or deletes a file. Records carry the account's
+    "password" alongside profile and workouts.
+    """
+    data = read_json(path, {}, move_damaged=False)
+    if _is_monolith(data):
+        data = _replay_monolith(data, [path + ".journal.compacting", path + ".journal"])
+        for username, user in data.items():
+            yield username, dict(new_user_record(), **user)
+        return
+    for username, entry in data.items():
+        user, _ = _load_shard(shard_path(data_dir, username), move_damaged=False)
+        yield username, dict(user, password=entry.get("password", ""))
+
+
+def coalesce_changes(records):
+    """Merge queued change records into at most one profile save and one workout append"""
+    profile = None
+    workouts = []
+    for record in records:
+        if record["op"] == "save_profile":
+            profile = record
+        elif record["op"] == "add_workouts":
+            workouts.extend(record["workouts"])
+    changes = [profile] if profile else []
+    if workouts:
+        changes.append({"op": "add_workouts", "workouts": workouts})
+    return changes
+
+
+def _apply_change(user, last_id, record):
+    """Apply one journal record to a user record; return the new highest workout id"""
+    op = record["op"]
+    if op == "save_profile":
+        user["profile"] = record["profile"]
+    elif op == "add_workouts":
+        added = []
+        for w in record["workouts"]:
+            if w["id"] > last_id:
+                added.append(w)
+                last_id = w["id"]
+        user.setdefault("workouts", []).extend(added)
+    return last_id
+
+
+class UserShard:
+    """One account's data file plus an append-only journal of changes.
+
+    Every change is appended to <shard>.journal as one JSON line with a
+    single write() and fsync, so a save costs the same however much data
+    exists. Loading replays the journal onto the last snapshot, and a
+    background thread folds the journal back into the snapshot once it
+    passes JOURNAL_COMPACT_BYTES.
+
+    Workouts carry an "id" so replaying a record that already made it into
+    the snapshot (a crash mid-compaction) is a no-op.
+
+    For write-behind saves, ``stage`` applies a change in memory and
+    ``append`` journals it later, from another thread. A compaction in
+    between puts the change in the snapshot and the journal then holds it
+    twice, which replaying also shrugs off.
+    """
+
+    def __init__(self, path, compact_bytes=JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compacting_path = path + ".journal.compacting"
+        self.compact_bytes = compact_bytes
+        self.lock = threading.Lock()
+        self.journal = None
+        self.journal_size = 0
+        self.compactor = None
+        with span("storage:load_shard", "storage"):
+            self.user, self.last_id = _load_shard(self.path)
+
+    def _write(self, data):
+        """Append lines to the journal with one write and fsync; the lock must be held"""
+        if self.journal is None:
+            self.journal = open(self.journal_path, "a+b", buffering=0)
+            self.journal_size = self.journal.seek(0, os.SEEK_END)
+            if self.journal_size:
+                self.journal.seek(-1, os.SEEK_END)
+                if self.journal.read(1) != b"\n":
+                    # Keep records after a torn line on their own line
+                    data = b"\n" + data
+        self.journal.write(data)
+        os.fsync(self.journal.fileno())
+        self.journal_size += len(data)
+        if self.journal_size >= self.compact_bytes and self.compactor is None:
+            self.compactor = threading.Thread(target=self.compact, daemon=True)
+            self.compactor.start()
+
+    def commit(self, record):
+        """Append one change record to the journal, then apply it in memory"""
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with span("storage:journal_write", "storage", op=record["op"]), self.lock:
+            self._write(line)
+            self.last_id = _apply_change(self.user, self.last_id, record)
+
+    def stage(self, record):
+        """Apply a change in memory only; ``append`` writes it to the journal"""
+        with self.lock:
+            self.last_id = _apply_change(self.user, self.last_id, record)
+
+    def append(self, records):
+        """Journal changes already applied by ``stage``"""
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode("utf-8")
+        with span("storage:journal_write", "storage", records=len(records)), self.lock:
+            self._write(data)
+
+    def workouts_record(self, workouts):
+        numbered = [dict(w, id=self.last_id + i) for i, w in enumerate(workouts, start=1)]
+        return {"op": "add_workouts", "workouts": numbered}
+
+    def add_workouts(self, workouts):
+        self.commit(self.workouts_record(workouts))
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        with span("storage:compact", "storage"):
+            with self.lock:
+                if self.journal is not None:
+                    self.journal.close()
+                    self.journal = None
+                # A leftover .compacting file means an earlier compaction died
+                # before its snapshot landed; leave the journal in place this
+                # round rather than overwrite records that are not on disk yet
+                if os.path.exists(self.journal_path) and not os.path.exists(self.compacting_path):
+                    os.replace(self.journal_path, self.compacting_path)
+                    self.journal_size = 0
+                # Workout and profile dicts are never mutated once stored, so
+                # copying the containers is enough for a consistent snapshot
+                workouts = self.user["workouts"]
+                snapshot = dict(self.user, workouts=list(workouts), rollups=workouts.rollups.to_dict())
+
+            try:
+                write_json_atomic(self.path, snapshot)
+                if os.path.exists(self.compacting_path):
+                    os.remove(self.compacting_path)
+            finally:
+                with self.lock:
+                    self.compactor = None
+
+    def close(self):
+        compactor = self.compactor
+        if compactor is not None:
+            compactor.join()
+        with self.lock:
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+
+
+class JsonStorage:
+    """Keeps a small credentials index in users.json and one shard per account.
+
+    Only the index is read at startup; an account's shard in user_data/ is
+    loaded the first time it is opened, so startup and login cost the same
+    however many accounts exist.
+    """
+
+    def __init__(self, path=DATA_FILE, data_dir=USER_DATA_DIR, compact_bytes=JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.data_dir = data_dir
+        self.compact_bytes = compact_bytes
+        self.shards = {}
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        index = read_json(self.path, {})
+
+        legacy_journals = [self.path + ".journal.compacting", self.path + ".journal"]
+        if _is_monolith(index) or any(os.path.exists(p) for p in legacy_journals):
+            index = self._migrate_monolith(index, legacy_journals)
+        return index
+
+    def _migrate_monolith(self, data, legacy_journals):
+        """Split an all-accounts users.json (and its journal) into per-user shards"""
+        if not _is_monolith(data):
+            # Index already migrated; the journals are leftovers of that run
+            for path in legacy_journals:
+                if os.path.exists(path):
+                    os.remove(path)
+            return data
+
+        data = _replay_monolith(data, legacy_journals)
+        index = {}
+        for username, user in data.items():
+            index[username] = {"password": user.pop("password", "")}
+            write_json_atomic(self._shard_path(username), dict(new_user_record(), **user))
+        write_json_atomic(self.path, index)
+        for path in legacy_journals:
+            if os.path.exists(path):
+                os.remove(path)
+        return index
+
+    def _shard_path(self, username):
+        return shard_path(self.data_dir, username)
+
+    def _shard(self, username):
+        shard = self.shards.get(username)
+        if shard is None:
+            shard = UserShard(self._shard_path(username), self.compact_bytes)
+            self.shards[username] = shard
+        return shard
+
+    def usernames(self):
+        return list(self.index)
+
+    def user_exists(self, username):
+        return username in self.index
+
+    def check_password(self, username, password):
+        entry = self.index.get(username)
+        return bool(entry) and entry.get("password") == password
+
+    def create_user(self, username, password):
+        self.index[username] = {"password": password}
+        write_json_atomic(self.path, self.index)
+
+    def get_user(self, username):
+        if username not in self.index:
+            return None
+        return self._shard(username).user
+
+    def reload_user(self, username):
+        self.release_user(username)
+        return self.get_user(username)
+
+    def release_user(self, username):
+        shard = self.shards.pop(username, None)
+        if shard is not None:
+            shard.close()
+
+    def save_profile(self, username, profile):
+        self._shard(username).commit({"op": "save_profile", "profile": profile})
+
+    def add_workout(self, username, workout):
+        self.add_workouts(username, [workout])
+
+    def add_workouts(self, username, workouts):
+        self._shard(username).add_workouts(workouts)
+
+    def stage_profile(self, username, profile):
+        """Apply a profile save in memory; returns the change for write_changes"""
+        record = {"op": "save_profile", "profile": profile}
+        self._shard(username).stage(record)
+        return record
+
+    def stage_workouts(self, username, workouts):
+        """Add workouts in memory; returns the change for write_changes"""
+        shard = self._shard(username)
+        record = shard.workouts_record(workouts)
+        shard.stage(record)
+        return record
+
+    def write_changes(self, username, records):
+        """Journal staged changes, coalesced into as few records as possible"""
+        self._shard(username).append(coalesce_changes(records))
+
+    def iter_workouts(self, username):
+        """Yield an account's workouts in date order"""
+        user = self.get_user(username)
+        if user is None:
+            raise KeyError(f"Unknown user: {username}")
+        return iter(user["workouts"])
+
+    def compact(self, usernames=None):
+        """Fold the accounts' journals, all of them by default, into their snapshots"""
+        for username in usernames or self.usernames():
+            opened = username in self.shards
+            shard = self._shard(username)
+            if shard.compactor is not None:
+                shard.compactor.join()
+            shard.compact()
+            if not opened:
+                self.release_user(username)
+
+    def close(self):
+        for username in list(self.shards):
+            self.release_user(username)
+
+
+# SQLite Backend
+# ---------------------------
+class SQLiteStorage:
+    """Keeps accounts in mark_kyle_fitness.db; every save touches only the rows it changes.
+
+    Write-behind saves (``write_changes``) run on a thread of their own,
+    so they get a second connection; WAL lets it write while the app's
+    connection keeps reading.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.conn = self._connect()
+        self.writer = None
+        self._migrate()
+        self.users = {}
+
+    def _connect(self, **kwargs):
+        conn = sqlite3.connect(self.path, **kwargs)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _migrate(self):
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(profiles)")}
+            for column, decl in (("name", "TEXT"), ("age", "INTEGER"), ("activity", "TEXT")):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE profiles ADD COLUMN {column} {decl}")
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+    def import_json(self, path=DATA_FILE, data_dir=USER_DATA_DIR):
+        """One-time migration of the JSON backend's accounts into the database.
+
+        The JSON files are only read, so switching back to the JSON backend
+        finds them as they were.
+        """
+        with self.conn:
+            for username, user in read_legacy_users(path, data_dir):
+                cur = self.conn.execute(
+                    "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                    (username, hash_password(user.get("password", "")))
+                )
+                user_id = cur.lastrowid
+                profile = {}
+                for key, value in user.get("profile", {}).items():
+                    profile[LEGACY_PROFILE_KEYS.get(key, key)] = value
+                if profile:
+                    self._write_profile(self.conn, user_id, profile)
+                self._insert_workouts(self.conn, user_id, user.get("workouts", []))
+
+    def _user_id(self, username, conn=None):
+        user = self.users.get(username)
+        if user is not None:
+            return user["id"]
+        # Writes don't need the account loaded, so a bulk import never
+        # holds the whole history in memory
+        row = (conn or self.conn).execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown user: {username}")
+        return row["id"]
+
+    def user_exists(self, username):
+        row = self.conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone()
+        return row is not None
+
+    def check_password(self, username, password):
+        row = self.conn.execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        return row is not None and verify_password(password, row["password_hash"])
+
+    def create_user(self, username, password):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                (username, hash_password(password))
+            )
+
+    def get_user(self, username):
+        if username in self.users:
+            return self.users[username]
+        with span("storage:load_user", "storage"):
+            return self._load_user(username)
+
+    def _load_user(self, username):
+        row = self.conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        user_id = row["id"]
+
+        profile = {}
+        prow = self.conn.execute("SELECT * FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        if prow is not None:
+            for key, column in PROFILE_COLUMNS.items():
+                profile[key] = _from_number(prow[column])
+
+        workouts = [
+            _workout_from_row(w)
+            for w in self.conn.execute(
+                "SELECT * FROM workouts WHERE user_id = ? ORDER BY date, id", (user_id,)
+            )
+        ]
+
+        tables = {}
+        for r in self.conn.execute(
+            "SELECT period, key, workouts, minutes, calories FROM rollups WHERE user_id = ?", (user_id,)
+        ):
+            tables.setdefault(r["period"], {})[r["key"]] = [r["workouts"], r["minutes"], r["calories"]]
+
+        if tables or not workouts:
+            store = WorkoutStore(workouts, Rollups(tables))
+        else:
+            # Rows written before rollups existed: build and persist them once
+            store = WorkoutStore(workouts)
+            with self.conn:
+                self._upsert_rollups(self.conn, user_id, rollup_deltas(workouts))
+
+        user = {"id": user_id, "profile": profile, "workouts": store, "settings": {}}
+        self.users[username] = user
+        return user
+
+    def reload_user(self, username):
+        self.release_user(username)
+        return self.get_user(username)
+
+    def release_user(self, username):
+        self.users.pop(username, None)
+
+    def iter_workouts(self, username):
+        """Yield an account's workouts in date order, straight from the database"""
+        cur = self.conn.execute(
+            "SELECT * FROM workouts WHERE user_id = ? ORDER BY date, id", (self._user_id(username),)
+        )
+        while True:
+            rows = cur.fetchmany(1000)
+            if not rows:
+                return
+            for w in rows:
+                yield _workout_from_row(w)
+
+    def _write_profile(self, conn, user_id, profile):
+        columns = list(PROFILE_COLUMNS.values())
+        values = [
+            profile.get(key, "") if column in TEXT_PROFILE_COLUMNS else _to_number(profile.get(key, ""))
+            for key, column in PROFILE_COLUMNS.items()
+        ]
+        conn.execute(
+            f"INSERT INTO profiles (user_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)}) "
+            f"ON CONFLICT(user_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns)}",
+            [user_id] + values
+        )
+
+    def save_profile(self, username, profile):
+        user_id = self._user_id(username)
+        with span("storage:save_profile", "storage"), self.conn:
+            self._write_profile(self.conn, user_id, profile)
+        if username in self.users:
+            self.users[username]["profile"] = profile
+
+    def _insert_workouts(self, conn, user_id, workouts):
+        conn.executemany(
+            "INSERT INTO workouts (user_id, date, type, duration_min, calories, notes, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (user_id, w.get("date", ""), w.get("type", ""), w.get("duration_min", 0),
+                 w.get("calories", 0), w.get("notes", ""), w.get("created_at", ""))
+                for w in workouts
+            ]
+        )
+
+    def _upsert_rollups(self, conn, user_id, deltas):
+        conn.executemany(
+            "INSERT INTO rollups (user_id, period, key, workouts, minutes, calories) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id, period, key) DO UPDATE SET "
+            "workouts = workouts + excluded.workouts, "
+            "minutes = minutes + excluded.minutes, "
+            "calories = calories + excluded.calories",
+            [(user_id, period, key, *totals) for (period, key), totals in deltas.items()]
+        )
+
+    def add_workout(self, username, workout):
+        self.add_workouts(username, [workout])
+
+    def add_workouts(self, username, workouts):
+        user_id = self._user_id(username)
+        with span("storage:add_workouts", "storage", rows=len(workouts)), self.conn:
+            self._insert_workouts(self.conn, user_id, workouts)
+            self._upsert_rollups(self.conn, user_id, rollup_deltas(workouts))
+        if username in self.users:
+            self.users[username]["workouts"].extend(workouts)
+
+    def _staged_user(self, username):
+        # Loaded before staging: loading afterwards would read the database
+        # before the queued write reaches it
+        user = self.get_user(username)
+        if user is None:
+            raise KeyError(f"Unknown user: {username}")
+        return user
+
+    def stage_profile(self, username, profile):
+        """Apply a profile save to the cached account; returns the change for write_changes"""
+        self._staged_user(username)["profile"] = profile
+        return {"op": "save_profile", "profile": profile}
+
+    def stage_workouts(self, username, workouts):
+        """Add workouts to the cached account; returns the change for write_changes"""
+        self._staged_user(username)["workouts"].extend(workouts)
+        return {"op": "add_workouts", "workouts": workouts}
+
+    def write_changes(self, username, records):
+        """Write staged changes in one transaction on the writer connection"""
+        if self.writer is None:
+            # Only ever used by one thread at a time: the write-behind
+            # thread, or whoever flushes while it is idle
+            self.writer = self._connect(check_same_thread=False)
+        conn = self.writer
+        user_id = self._user_id(username, conn)
+        with span("storage:write_changes", "storage", records=len(records)), conn:
+            for record in coalesce_changes(records):
+                if record["op"] == "save_profile":
+                    self._write_profile(conn, user_id, record["profile"])
+                else:
+                    self._insert_workouts(conn, user_id, record["workouts"])
+                    self._upsert_rollups(conn, user_id, rollup_deltas(record["workouts"]))
+
+    def compact(self):
+        """Rebuild the database file without free pages, then empty the WAL"""
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA optimize")
+        # VACUUM goes through the WAL, so checkpoint after it
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.conn.close()
+
+
+def open_storage(backend="sqlite"):
+    """Open the configured backend, migrating users.json into a fresh database"""
+    if backend == "json":
+        return JsonStorage()
+
+    storage = SQLiteStorage()
+    if storage.is_empty() and os.path.exists(DATA_FILE):
+        storage.import_json()
+    return storage
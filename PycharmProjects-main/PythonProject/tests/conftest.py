@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+
+# The app's modules sit flat in the project folder rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_workout():
+    """Build a workout dict as parse_workout returns it"""
+    def make(date, type="Running", duration_min=30, calories=300, notes=""):
+        return {
+            "date": date,
+            "type": type,
+            "duration_min": duration_min,
+            "calories": calories,
+            "notes": notes,
+            "created_at": f"{date}T07:00:00"
+        }
+    return make
@@ -0,0 +1,91 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from analytics import WorkoutColumns
+
+
+@pytest.fixture
+def workouts(make_workout):
+    return [
+        make_workout("2024-01-01", duration_min=30, calories=300),
+        make_workout("2024-01-01", type="Yoga", duration_min=60, calories=100),
+        make_workout("2024-01-02", duration_min=20, calories=200),
+        make_workout("2024-01-04", type="Yoga", duration_min=40, calories=150),
+        make_workout("2024-01-08", duration_min=10, calories=50),
+        # Free-text dates count as workouts but drop out of date-based results
+        make_workout("someday", duration_min=5, calories=5),
+    ]
+
+
+def days(*dates):
+    return np.array(dates, dtype="datetime64[D]")
+
+
+def test_daily_series_covers_first_to_last_workout(workouts):
+    columns = WorkoutColumns(workouts)
+    dates, counts, totals = columns.daily()
+
+    assert len(columns) == 6
+    assert (dates == np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-01-09"))).all()
+    assert counts.tolist() == [2, 1, 0, 1, 0, 0, 0, 1]
+    assert totals["duration_min"].tolist() == [90, 20, 0, 40, 0, 0, 0, 10]
+    assert totals["calories"].tolist() == [400, 200, 0, 150, 0, 0, 0, 50]
+
+
+def test_daily_totals_pad_days_outside_the_history(workouts):
+    columns = WorkoutColumns(workouts)
+    assert columns.daily_totals("calories", "2023-12-30", "2024-01-02").tolist() == [0, 0, 400, 200]
+    assert columns.daily_totals("count", "2024-01-08", "2024-01-10").tolist() == [1, 0, 0]
+    assert columns.daily_totals("count", "2025-01-01", "2025-01-02").tolist() == [0, 0]
+
+
+def test_grouped_sums(workouts):
+    columns = WorkoutColumns(workouts)
+
+    weeks, minutes = columns.grouped_sum("duration_min", "week")
+    # Week keys are the Monday each ISO week starts on
+    assert (weeks == days("2024-01-01", "2024-01-08")).all()
+    assert minutes.tolist() == [150, 10]
+
+    months, count = columns.grouped_sum("count", "month")
+    assert months.tolist() == [datetime.date(2024, 1, 1)]
+    assert count.tolist() == [5]
+
+    types, calories = columns.grouped_sum("calories", "type")
+    assert dict(zip(types, calories.tolist())) == {"Running": 555, "Yoga": 250}
+
+
+def test_rolling_mean(workouts):
+    columns = WorkoutColumns(workouts)
+    dates, means = columns.rolling_mean("duration_min", 2, "2024-01-01", "2024-01-03")
+    assert (dates == days("2024-01-01", "2024-01-02", "2024-01-03")).all()
+    assert means.tolist() == [45.0, 55.0, 10.0]
+
+
+@pytest.mark.parametrize("today, expected", [
+    ("2024-01-08", (1, 2)),
+    # Today has no workout yet, but yesterday did
+    ("2024-01-09", (1, 2)),
+    ("2024-01-10", (0, 2)),
+])
+def test_streaks(workouts, today, expected):
+    assert WorkoutColumns(workouts).streaks(today) == expected
+
+
+def test_streaks_without_workouts():
+    assert WorkoutColumns().streaks("2024-01-01") == (0, 0)
+
+
+def test_extend_invalidates_cached_results(workouts, make_workout):
+    columns = WorkoutColumns(workouts)
+    assert columns.streaks("2024-01-09") == (1, 2)
+    first = columns.daily()
+
+    columns.extend([make_workout("2024-01-03"), make_workout("2024-01-09", calories=1)])
+    assert columns.streaks("2024-01-09") == (2, 4)
+    assert columns.daily_totals("calories", "2024-01-09", "2024-01-09").tolist() == [1]
+    # Results handed out earlier are left as they were
+    assert len(first[0]) == 8
+    assert columns.percentiles("duration_min", (50,)).tolist() == [30.0]
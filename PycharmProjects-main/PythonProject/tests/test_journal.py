@@ -0,0 +1,100 @@
+import os
+import shutil
+
+import pytest
+
+from json_files import read_json
+from storage import JsonStorage, shard_path
+
+
+USER = "kyle"
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "users.json"), str(tmp_path / "user_data")
+
+
+def open_json(paths, compact_bytes=float("inf")):
+    return JsonStorage(*paths, compact_bytes=compact_bytes)
+
+
+def dates(storage):
+    return [w["date"] for w in storage.get_user(USER)["workouts"]]
+
+
+def test_journal_is_replayed_after_a_crash(paths, make_workout):
+    storage = open_json(paths)
+    storage.create_user(USER, "pw")
+    storage.add_workouts(USER, [make_workout("2024-01-02"), make_workout("2024-01-01")])
+    storage.save_profile(USER, {"name": "Kyle"})
+    storage.add_workout(USER, make_workout("2024-01-03"))
+
+    # No close or compaction: the next process only has what was journaled
+    reopened = open_json(paths)
+    try:
+        assert dates(reopened) == ["2024-01-01", "2024-01-02", "2024-01-03"]
+        assert reopened.get_user(USER)["profile"] == {"name": "Kyle"}
+    finally:
+        reopened.close()
+        storage.close()
+
+
+def test_torn_journal_line_is_skipped(paths, make_workout):
+    storage = open_json(paths)
+    storage.create_user(USER, "pw")
+    storage.add_workout(USER, make_workout("2024-01-01"))
+    storage.close()
+    with open(shard_path(paths[1], USER) + ".journal", "ab") as f:
+        f.write(b'{"op":"add_workouts","work')
+
+    storage = open_json(paths)
+    assert dates(storage) == ["2024-01-01"]
+    # Records written after the torn line still replay
+    storage.add_workout(USER, make_workout("2024-01-02"))
+    storage.close()
+
+    storage = open_json(paths)
+    assert dates(storage) == ["2024-01-01", "2024-01-02"]
+    storage.close()
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(paths, make_workout):
+    storage = open_json(paths, compact_bytes=1)
+    storage.create_user(USER, "pw")
+    storage.add_workouts(USER, [make_workout("2024-01-01"), make_workout("2024-01-02")])
+    # Waits for the background compaction the write started
+    storage.close()
+
+    path = shard_path(paths[1], USER)
+    assert not os.path.exists(path + ".journal")
+    assert not os.path.exists(path + ".journal.compacting")
+    snapshot = read_json(path)
+    assert [w["date"] for w in snapshot["workouts"]] == ["2024-01-01", "2024-01-02"]
+    assert snapshot["rollups"]["day"]["2024-01-01"] == [1, 30, 300]
+
+    storage = open_json(paths)
+    assert dates(storage) == ["2024-01-01", "2024-01-02"]
+    storage.close()
+
+
+def test_replay_after_a_crash_mid_compaction_adds_nothing_twice(paths, make_workout):
+    storage = open_json(paths)
+    storage.create_user(USER, "pw")
+    storage.add_workouts(USER, [make_workout("2024-01-01"), make_workout("2024-01-02")])
+    path = shard_path(paths[1], USER)
+    journal = path + ".journal"
+    shutil.copy(journal, journal + ".saved")
+    storage.compact([USER])
+    storage.close()
+
+    # The snapshot landed but the process died before removing the old journal
+    os.replace(journal + ".saved", path + ".journal.compacting")
+    storage = open_json(paths)
+    assert dates(storage) == ["2024-01-01", "2024-01-02"]
+    storage.add_workout(USER, make_workout("2024-01-03"))
+    storage.close()
+
+    storage = open_json(paths)
+    assert dates(storage) == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    storage.close()
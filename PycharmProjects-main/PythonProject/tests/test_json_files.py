@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+from json_files import read_json, write_json_atomic
+from storage import JsonStorage, shard_path
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "settings.json")
+
+
+def write_raw(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_replaced_file_becomes_the_backup(path):
+    write_json_atomic(path, {"version": 1})
+    write_json_atomic(path, {"version": 2})
+
+    assert read_json(path) == {"version": 2}
+    with open(path + ".bak", encoding="utf-8") as f:
+        assert json.load(f) == {"version": 1}
+    assert not os.path.exists(path + ".tmp")
+
+
+@pytest.mark.parametrize("damage", ['{"version": 2', "", "[1, 2]", "null"])
+def test_damaged_file_is_recovered_from_its_backup(path, damage):
+    write_json_atomic(path, {"version": 1})
+    write_json_atomic(path, {"version": 2})
+    write_raw(path, damage)
+
+    assert read_json(path) == {"version": 1}
+    # Set aside, so the next write cannot rotate it over the good backup
+    assert not os.path.exists(path)
+    with open(path + ".corrupt", encoding="utf-8") as f:
+        assert f.read() == damage
+
+    write_json_atomic(path, {"version": 3})
+    assert read_json(path) == {"version": 3}
+    with open(path + ".bak", encoding="utf-8") as f:
+        assert json.load(f) == {"version": 1}
+
+
+def test_readers_can_leave_damaged_files_alone(path):
+    write_json_atomic(path, {"version": 1})
+    write_json_atomic(path, {"version": 2})
+    write_raw(path, "{")
+
+    assert read_json(path, move_damaged=False) == {"version": 1}
+    assert os.path.exists(path)
+    assert not os.path.exists(path + ".corrupt")
+
+
+def test_default_when_nothing_can_be_read(path):
+    assert read_json(path, {}) == {}
+    write_raw(path, "{")
+    write_raw(path + ".bak", "[]")
+    assert read_json(path) is None
+
+
+def test_damaged_account_shard_loads_from_its_backup(tmp_path, make_workout):
+    paths = str(tmp_path / "users.json"), str(tmp_path / "user_data")
+    storage = JsonStorage(*paths)
+    storage.create_user("kyle", "pw")
+    storage.add_workout("kyle", make_workout("2024-01-01"))
+    storage.compact(["kyle"])
+    storage.add_workout("kyle", make_workout("2024-01-02"))
+    storage.compact(["kyle"])
+    storage.close()
+    write_raw(shard_path(paths[1], "kyle"), '{"workouts": [')
+
+    storage = JsonStorage(*paths)
+    try:
+        assert [w["date"] for w in storage.get_user("kyle")["workouts"]] == ["2024-01-01"]
+    finally:
+        storage.close()
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+
+import pytest
+
+from persistence import WriteBehind
+from storage import JsonStorage, SQLiteStorage, shard_path
+from user_model import UserModel
+
+
+class Recorder:
+    """A write callback that records each call's changes and can be told to fail"""
+
+    def __init__(self, fail=0):
+        self.calls = []
+        self.fail = fail
+        self.written = threading.Event()
+
+    def __call__(self, changes):
+        if self.fail:
+            self.fail -= 1
+            raise OSError("disk full")
+        self.calls.append(list(changes))
+        self.written.set()
+
+
+@pytest.fixture
+def make_writer():
+    writers = []
+
+    def make(**kwargs):
+        writers.append(WriteBehind(**kwargs))
+        return writers[-1]
+
+    yield make
+    for writer in writers:
+        writer.close()
+
+
+def test_a_burst_of_changes_is_written_once_in_order(make_writer):
+    writer = make_writer(delay=0.2, max_delay=5)
+    write = Recorder()
+    for change in range(5):
+        writer.schedule("settings", change, write)
+
+    assert write.written.wait(2)
+    time.sleep(0.1)
+    assert write.calls == [[0, 1, 2, 3, 4]]
+
+
+def test_a_steady_stream_is_written_after_max_delay(make_writer):
+    # Changes never stop for long enough to meet the delay
+    writer = make_writer(delay=60, max_delay=0.05)
+    write = Recorder()
+    start = time.monotonic()
+    writer.schedule("settings", "a", write)
+
+    assert write.written.wait(5)
+    assert time.monotonic() - start < 5
+    assert write.calls == [["a"]]
+
+
+def test_each_target_gets_its_own_write(make_writer):
+    writer = make_writer(delay=60, max_delay=60)
+    settings, account = Recorder(), Recorder()
+    writer.schedule("settings", 1, settings)
+    writer.schedule(("user", "kyle"), "x", account)
+    writer.schedule("settings", 2, settings)
+    writer.flush()
+
+    assert settings.calls == [[1, 2]]
+    assert account.calls == [["x"]]
+
+
+def test_failed_writes_stay_queued_and_flush_raises(make_writer):
+    writer = make_writer(delay=60, max_delay=60)
+    write = Recorder(fail=1)
+    writer.schedule("settings", 1, write)
+    with pytest.raises(OSError):
+        writer.flush()
+
+    # Retried with the older change first
+    writer.schedule("settings", 2, write)
+    writer.flush()
+    assert write.calls == [[1, 2]]
+    writer.flush()
+    assert write.calls == [[1, 2]]
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def storage(request, tmp_path):
+    def open_storage():
+        if request.param == "sqlite":
+            return SQLiteStorage(str(tmp_path / "fitness.db"))
+        return JsonStorage(str(tmp_path / "users.json"), str(tmp_path / "user_data"),
+                           compact_bytes=float("inf"))
+    return open_storage
+
+
+def test_model_saves_are_cached_at_once_and_written_on_flush(storage, make_writer, make_workout):
+    writer = make_writer(delay=60, max_delay=60)
+    s = storage()
+    s.create_user("kyle", "pw")
+    model = UserModel(s, "kyle", writer)
+    added = []
+    model.subscribe("workouts_added", added.extend)
+
+    model.add_workout(make_workout("2024-01-02"))
+    model.save_profile({"name": "Kyle"})
+    model.add_workouts([make_workout("2024-01-01"), make_workout("2024-01-03")])
+    model.save_profile({"name": "Kyle B"})
+
+    # The UI sees its changes before anything is on disk
+    assert [w["date"] for w in model.workouts] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert model.profile == {"name": "Kyle B"}
+    assert len(added) == 3
+    reader = storage()
+    assert len(reader.get_user("kyle")["workouts"]) == 0
+    reader.close()
+
+    model.flush()
+    if isinstance(s, JsonStorage):
+        # The burst went out coalesced: one profile save and one append
+        with open(shard_path(str(s.data_dir), "kyle") + ".journal", encoding="utf-8") as f:
+            assert [json.loads(line)["op"] for line in f] == ["save_profile", "add_workouts"]
+    s.close()
+
+    s = storage()
+    try:
+        user = s.get_user("kyle")
+        assert [w["date"] for w in user["workouts"]] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+        assert user["profile"]["name"] == "Kyle B"
+        assert user["workouts"].rollups.get("month", "2024-01") == (3, 90, 900)
+    finally:
+        s.close()
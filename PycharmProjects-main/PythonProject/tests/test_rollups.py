@@ -0,0 +1,78 @@
+import pytest
+
+from rollups import Rollups, rollup_deltas, rollup_keys
+from storage import JsonStorage, SQLiteStorage
+
+
+def dict_tables(deltas):
+    tables = {}
+    for (period, key), totals in deltas.items():
+        tables.setdefault(period, {})[key] = totals
+    return tables
+
+
+def test_buckets_use_iso_weeks_and_months(make_workout):
+    assert sorted(rollup_keys(make_workout("2024-12-30", type="Yoga"))) == [
+        ("day", "2024-12-30"), ("month", "2024-12"), ("type", "Yoga"), ("week", "2025-W01")
+    ]
+    # Free-text dates still get day and type totals
+    assert sorted(rollup_keys(make_workout("last tuesday"))) == [("day", "last tuesday"), ("type", "Running")]
+
+
+def test_incremental_totals_match_a_rebuild(make_workout):
+    workouts = [
+        make_workout("2024-01-31", duration_min=20, calories=100),
+        make_workout("2024-02-01", type="Yoga", duration_min=60, calories=150),
+        make_workout("2024-01-31", type="Yoga", duration_min=10, calories=40),
+    ]
+    rollups = Rollups()
+    rollups.add(workouts[0])
+    rollups.extend(workouts[1:])
+
+    assert rollups.to_dict() == Rollups(dict_tables(rollup_deltas(workouts))).to_dict()
+    assert rollups.get("day", "2024-01-31") == (2, 30, 140)
+    assert rollups.get("type", "Yoga") == (2, 70, 190)
+    assert rollups.get("day", "2024-03-01") == (0, 0, 0)
+    assert rollups.month_days(2024, 1) == {"2024-01-31": [2, 30, 140]}
+
+
+def test_persisted_tables_round_trip(make_workout):
+    rollups = Rollups()
+    rollups.extend([make_workout("2024-05-01"), make_workout("2024-05-02")])
+    restored = Rollups(rollups.to_dict())
+
+    assert restored.to_dict() == rollups.to_dict()
+    assert restored.month_days(2024, 5) == {"2024-05-01": [1, 30, 300], "2024-05-02": [1, 30, 300]}
+    # Day buckets and their month index share totals, so later adds show in both
+    restored.add(make_workout("2024-05-01"))
+    assert restored.month_days(2024, 5)["2024-05-01"] == [2, 60, 600]
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def storage(request, tmp_path):
+    def open_storage():
+        if request.param == "sqlite":
+            return SQLiteStorage(str(tmp_path / "fitness.db"))
+        return JsonStorage(str(tmp_path / "users.json"), str(tmp_path / "user_data"))
+    return open_storage
+
+
+def test_backends_keep_stored_totals_in_step(storage, make_workout):
+    first = [make_workout("2024-01-01"), make_workout("2024-01-02", type="Yoga")]
+    later = [make_workout("2024-01-02", calories=50)]
+    s = storage()
+    s.create_user("kyle", "pw")
+    s.add_workouts("kyle", first)
+    if isinstance(s, JsonStorage):
+        # Totals from the snapshot, then the journal replayed on top
+        s.compact(["kyle"])
+    s.add_workouts("kyle", later)
+    s.close()
+
+    s = storage()
+    try:
+        assert s.get_user("kyle")["workouts"].rollups.to_dict() == Rollups(
+            dict_tables(rollup_deltas(first + later))
+        ).to_dict()
+    finally:
+        s.close()
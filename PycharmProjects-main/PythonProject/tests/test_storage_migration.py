@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+from storage import JsonStorage, SQLiteStorage, read_legacy_users, shard_path
+
+
+LEGACY_USERS = {
+    "kyle": {
+        "password": "123",
+        "profile": {"name": "kyle", "age": "18", "weight": "59", "height": "170", "goal": "2000",
+                    "activity": "moderate"},
+        "workouts": [
+            {"date": "2025-12-04", "type": "squat", "duration_min": 130, "calories": 20, "notes": "",
+             "created_at": "2025-12-04T22:55:49"},
+            {"date": "2025-12-01", "type": "Running", "duration_min": 30, "calories": 300, "notes": "easy",
+             "created_at": "2025-12-01T07:00:00"}
+        ]
+    },
+    "mark": {"password": "abc", "profile": {}, "workouts": []}
+}
+
+
+@pytest.fixture
+def legacy(tmp_path, make_workout):
+    """An all-accounts users.json, plus a journal written after its last snapshot"""
+    folder = tmp_path / "legacy"
+    folder.mkdir()
+    path = folder / "users.json"
+    path.write_text(json.dumps(LEGACY_USERS), encoding="utf-8")
+    records = [
+        {"op": "create_user", "user": "ann", "password": "pw"},
+        {"op": "add_workouts", "user": "ann", "workouts": [dict(make_workout("2025-11-30"), id=1)]}
+    ]
+    (folder / "users.json.journal").write_text(
+        "".join(json.dumps(r) + "\n" for r in records), encoding="utf-8"
+    )
+    return str(path), str(folder / "user_data")
+
+
+def file_contents(folder):
+    return {name: (folder / name).read_bytes() for name in sorted(os.listdir(folder))}
+
+
+def test_migration_to_sqlite_round_trips_accounts(tmp_path, legacy):
+    before = file_contents(tmp_path / "legacy")
+    storage = SQLiteStorage(str(tmp_path / "fitness.db"))
+    storage.import_json(*legacy)
+    try:
+        assert storage.check_password("kyle", "123")
+        assert not storage.check_password("kyle", "wrong")
+        assert storage.check_password("mark", "abc")
+        assert storage.check_password("ann", "pw")
+
+        kyle = storage.get_user("kyle")
+        assert kyle["profile"] == {
+            "name": "kyle", "age": "18", "weight_(kg)": "59", "height_(cm)": "170",
+            "daily_calorie_goal": "2000", "activity": "moderate"
+        }
+        assert [(w["date"], w["notes"]) for w in kyle["workouts"]] == [("2025-12-01", "easy"), ("2025-12-04", "")]
+        assert kyle["workouts"].rollups.get("day", "2025-12-04") == (1, 130, 20)
+        assert [w["date"] for w in storage.get_user("ann")["workouts"]] == ["2025-11-30"]
+    finally:
+        storage.close()
+
+    # Switching back to the JSON backend finds its files as they were
+    assert file_contents(tmp_path / "legacy") == before
+
+
+def test_json_backend_splits_legacy_file_into_shards(legacy):
+    storage = JsonStorage(*legacy)
+    try:
+        # Only the credentials index is read up front
+        assert storage.shards == {}
+        assert sorted(storage.usernames()) == ["ann", "kyle", "mark"]
+        assert storage.check_password("kyle", "123")
+        assert not os.path.exists(legacy[0] + ".journal")
+        with open(legacy[0], encoding="utf-8") as f:
+            assert json.load(f)["kyle"] == {"password": "123"}
+
+        assert os.path.exists(shard_path(legacy[1], "kyle"))
+        assert len(storage.get_user("kyle")["workouts"]) == 2
+        assert list(storage.shards) == ["kyle"]
+    finally:
+        storage.close()
+
+
+def test_migration_reads_the_sharded_layout(tmp_path, make_workout):
+    paths = str(tmp_path / "users.json"), str(tmp_path / "user_data")
+    storage = JsonStorage(*paths)
+    storage.create_user("kyle", "123")
+    storage.save_profile("kyle", {"name": "Kyle"})
+    storage.add_workout("kyle", make_workout("2024-05-01"))
+    storage.close()
+
+    users = dict(read_legacy_users(*paths))
+    assert users["kyle"]["password"] == "123"
+    assert users["kyle"]["profile"] == {"name": "Kyle"}
+
+    db = SQLiteStorage(str(tmp_path / "fitness.db"))
+    db.import_json(*paths)
+    try:
+        assert db.check_password("kyle", "123")
+        assert [w["date"] for w in db.get_user("kyle")["workouts"]] == ["2024-05-01"]
+    finally:
+        db.close()
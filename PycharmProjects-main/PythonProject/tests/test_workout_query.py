@@ -0,0 +1,124 @@
+import datetime
+import random
+
+import pytest
+
+from workout_store import QueryResults, WorkoutStore
+
+
+FILTERS = [
+    {},
+    {"workout_type": "Yoga"},
+    {"note": "HILLS"},
+    {"date_from": "2024-02-01", "date_to": "2024-02-15"},
+    {"workout_type": "Running", "note": "hills", "date_from": "2024-01-20"},
+    {"min_duration": 30, "max_duration": 60, "min_calories": 200},
+    {"max_calories": 150, "workout_type": "Rowing"},
+    {"workout_type": "Swimming"},
+]
+
+
+@pytest.fixture(scope="module")
+def workouts():
+    rng = random.Random(7)
+    first = datetime.date(2024, 1, 1)
+    out = []
+    for i in range(2000):
+        duration = rng.randint(5, 90)
+        workout = {
+            "date": (first + datetime.timedelta(days=rng.randrange(60))).isoformat(),
+            "type": rng.choice(["Running", "Yoga", "Rowing"]),
+            "duration_min": duration,
+            "calories": duration * rng.randint(2, 10),
+            "notes": rng.choice(["", "", "uphill hills", "easy"]) + f" #{i}",
+        }
+        if i % 50 == 0:
+            # Older rows can lack a numeric field
+            del workout["calories"]
+        out.append(workout)
+    return out
+
+
+@pytest.fixture(scope="module")
+def store(workouts):
+    # Built in batches, as an import fills it
+    store = WorkoutStore()
+    for i in range(0, len(workouts), 300):
+        store.extend(workouts[i:i + 300])
+    return store
+
+
+def brute_force(workouts, sort_by="date", descending=True, date_from=None, date_to=None, workout_type=None,
+                min_duration=None, max_duration=None, min_calories=None, max_calories=None, note=None):
+    def matches(w):
+        return (
+            (not date_from or w["date"] >= date_from)
+            and (not date_to or w["date"] <= date_to)
+            and (not workout_type or w["type"] == workout_type)
+            and (min_duration is None or w["duration_min"] >= min_duration)
+            and (max_duration is None or w["duration_min"] <= max_duration)
+            and (min_calories is None or w.get("calories", 0) >= min_calories)
+            and (max_calories is None or w.get("calories", 0) <= max_calories)
+            and (not note or note.lower() in w["notes"].lower())
+        )
+
+    found = sorted((w for w in workouts if matches(w)), key=lambda w: w["date"])
+    if sort_by == "date":
+        if descending:
+            # Newest date first, each date's workouts in the order they were added
+            dates = sorted({w["date"] for w in found}, reverse=True)
+            by_date = {date: [w for w in found if w["date"] == date] for date in dates}
+            return [w for date in dates for w in by_date[date]]
+        return found
+    found.sort(key=lambda w: w.get(sort_by, 0))
+    return found[::-1] if descending else found
+
+
+def all_pages(store, limit, **filters):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = store.query(limit=limit, cursor=cursor, **filters)
+        assert len(page) <= limit
+        rows.extend(page)
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("limit", [1, 37, 5000])
+def test_date_pages_match_brute_force(store, workouts, filters, descending, limit):
+    expected = brute_force(workouts, descending=descending, **filters)
+    rows, pages = all_pages(store, limit, descending=descending, **filters)
+    assert [w["notes"] for w in rows] == [w["notes"] for w in expected]
+    # Every page but the last is full
+    assert pages == max(1, -(-len(expected) // limit))
+
+
+@pytest.mark.parametrize("sort_by", ["duration_min", "calories", "type"])
+@pytest.mark.parametrize("descending", [True, False])
+def test_field_pages_match_brute_force(store, workouts, sort_by, descending):
+    filters = {"date_from": "2024-01-10", "note": "hills"}
+    expected = brute_force(workouts, sort_by, descending, **filters)
+    rows, _ = all_pages(store, 25, sort_by=sort_by, descending=descending, **filters)
+    assert [w["notes"] for w in rows] == [w["notes"] for w in expected]
+
+
+def test_pages_follow_new_workouts(workouts):
+    store = WorkoutStore(workouts[:1000])
+    filters = {"workout_type": "Yoga"}
+    assert all_pages(store, 50, **filters)[0] == brute_force(workouts[:1000], **filters)
+    # Type runs built for the first query are dropped when the data changes
+    store.extend(workouts[1000:])
+    assert all_pages(store, 50, **filters)[0] == brute_force(workouts, **filters)
+
+
+def test_query_results_scroll_like_a_list(store, workouts):
+    results = QueryResults(store, page_size=40, workout_type="Rowing", descending=False)
+    expected = brute_force(workouts, descending=False, workout_type="Rowing")
+    assert results.rows(0, 10) == expected[:10]
+    assert len(results) == 40
+    assert results.rows(90, 130) == expected[90:130]
+    assert results.rows(0, len(expected) + 10) == expected
+    assert results.exhausted
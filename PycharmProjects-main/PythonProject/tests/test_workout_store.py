@@ -0,0 +1,59 @@
+import datetime
+import random
+
+import pytest
+
+from workout_store import BULK_THRESHOLD, WorkoutStore
+
+
+def random_workouts(make_workout, count, seed=1):
+    rng = random.Random(seed)
+    first = datetime.date(2024, 1, 1)
+    return [
+        make_workout((first + datetime.timedelta(days=rng.randrange(90))).isoformat(),
+                     type=rng.choice(["Running", "Yoga", "Rowing"]), notes=str(i))
+        for i in range(count)
+    ]
+
+
+def oldest_first(workouts):
+    # sorted() is stable, so ties stay in the order they were added
+    return sorted(workouts, key=lambda w: w["date"])
+
+
+def test_orders_by_date_keeping_insertion_order_within_a_date(make_workout):
+    a, b, c, d = (make_workout("2024-01-02", notes="a"), make_workout("2024-01-01", notes="b"),
+                  make_workout("2024-01-02", notes="c"), make_workout("2024-01-03", notes="d"))
+    store = WorkoutStore([a, b])
+    store.add(c)
+    store.add(d)
+
+    assert list(store) == [b, a, c, d]
+    assert list(store.latest_first()) == [d, a, c, b]
+    assert store.on_date("2024-01-02") == [a, c]
+    assert store.on_date("2024-02-01") == []
+    assert store.between("2024-01-02", "2024-01-03") == [a, c, d]
+    assert len(store) == 4
+
+
+@pytest.mark.parametrize("batch_size", [1, BULK_THRESHOLD - 1, BULK_THRESHOLD, 250, 1000])
+def test_batches_end_up_as_if_added_at_once(make_workout, batch_size):
+    workouts = random_workouts(make_workout, 1500)
+    store = WorkoutStore()
+    for i in range(0, len(workouts), batch_size):
+        store.extend(workouts[i:i + batch_size])
+
+    assert list(store) == oldest_first(workouts)
+    assert list(store) == list(WorkoutStore(workouts))
+    assert store.between("2024-02-01", "2024-02-29") == [
+        w for w in oldest_first(workouts) if "2024-02-01" <= w["date"] <= "2024-02-29"
+    ]
+
+
+def test_batch_newer_than_everything_is_appended(make_workout):
+    old = [make_workout(f"2024-01-{day:02d}") for day in range(1, 29)]
+    new = [make_workout(f"2024-02-{day % 28 + 1:02d}", notes=str(day)) for day in range(56, 0, -1)]
+    store = WorkoutStore(old)
+    store.extend(new)
+    assert list(store) == old + oldest_first(new)
+
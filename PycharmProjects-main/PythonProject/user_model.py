@@ -0,0 +1,76 @@
+from repository import WorkoutRepository
+
+
+class UserModel(WorkoutRepository):
+    """The logged-in user's workouts and profile, with change events.
+
+    Writes go through the model so it can tell subscribers what changed:
+
+    - ``"workouts_added"`` with the list of new workouts
+    - ``"profile_changed"`` with the saved profile
+    - ``"reloaded"`` with no arguments, after everything was re-read
+
+    Widgets subscribe to the events for the data they display and update
+    just that, so a save costs the UI what it changed rather than a
+    page rebuild. Callbacks run on the thread that made the change.
+
+    Given a WriteBehind, saves change the cached account straight away
+    and are written to disk later on its thread, so the UI never waits on
+    the disk. Reads that go to the backend rather than the cache
+    (``iter_workouts``, ``reload``) flush the queued writes first.
+    """
+
+    def __init__(self, storage, username, writer=None):
+        super().__init__(storage, username)
+        self.writer = writer
+        self.subscribers = {}
+
+    def subscribe(self, event, callback):
+        """Call callback on every event; returns a function that unsubscribes"""
+        callbacks = self.subscribers.setdefault(event, [])
+        callbacks.append(callback)
+        return lambda: callback in callbacks and callbacks.remove(callback)
+
+    def emit(self, event, *args):
+        for callback in list(self.subscribers.get(event, ())):
+            callback(*args)
+
+    def close(self):
+        """Drop all subscribers, e.g. once their widgets are destroyed"""
+        self.subscribers.clear()
+
+    def _write_changes(self, records):
+        self.storage.write_changes(self.username, records)
+
+    def flush(self):
+        """Write any queued saves now; raises if one of them fails"""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def add_workout(self, workout):
+        self.add_workouts([workout])
+
+    def add_workouts(self, workouts):
+        if self.writer is None:
+            super().add_workouts(workouts)
+        else:
+            change = self.storage.stage_workouts(self.username, workouts)
+            self.writer.schedule(("user", self.username), change, self._write_changes)
+        self.emit("workouts_added", workouts)
+
+    def save_profile(self, profile):
+        if self.writer is None:
+            super().save_profile(profile)
+        else:
+            change = self.storage.stage_profile(self.username, profile)
+            self.writer.schedule(("user", self.username), change, self._write_changes)
+        self.emit("profile_changed", self.profile)
+
+    def iter_workouts(self):
+        self.flush()
+        return super().iter_workouts()
+
+    def reload(self):
+        self.flush()
+        super().reload()
+        self.emit("reloaded")
@@ -0,0 +1,59 @@
+import tkinter as tk
+
+from perf import span
+
+
+class ViewManager:
+    """Builds each page once and switches between them with pack/pack_forget.
+
+    A page is registered with a ``build(frame)`` function that lays out
+    its widgets and returns a callable refreshing its data-bound widgets,
+    or None if the page shows no stored data. ``invalidate`` marks pages
+    stale: the visible one refreshes straight away, hidden ones the next
+    time they are shown, so a tab switch never rebuilds a widget tree.
+    """
+
+    def __init__(self, parent, bg=None):
+        self.parent = parent
+        self.bg = bg
+        self.builders = {}
+        self.pages = {}
+        self.stale = set()
+        self.current = None
+
+    def register(self, name, build):
+        self.builders[name] = build
+
+    def show(self, name):
+        with span(f"show:{name}", "ui"):
+            page = self.pages.get(name)
+            if page is None:
+                with span(f"build:{name}", "ui"):
+                    frame = tk.Frame(self.parent, bg=self.bg)
+                    page = self.pages[name] = (frame, self.builders[name](frame))
+                self.stale.discard(name)
+            elif name in self.stale:
+                self._update(name)
+
+            if self.current != name:
+                if self.current is not None:
+                    self.pages[self.current][0].pack_forget()
+                page[0].pack(fill="both", expand=True)
+                self.current = name
+
+    def invalidate(self, *names):
+        """Mark pages (all of them if none are named) as showing old data"""
+        for name in names or list(self.pages):
+            if name not in self.pages:
+                continue
+            if name == self.current:
+                self._update(name)
+            else:
+                self.stale.add(name)
+
+    def _update(self, name):
+        self.stale.discard(name)
+        update = self.pages[name][1]
+        if update:
+            with span(f"update:{name}", "ui"):
+                update()
@@ -0,0 +1,126 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable(tk.Frame):
+    """A Treeview that only materializes the rows on screen plus a small buffer.
+
+    Rows come from ``fetch(start, stop)`` (a list of value tuples) and
+    ``count()``. The widget keeps a fixed pool of Treeview items sized to
+    the visible area and rewrites their values as the view scrolls, paging
+    rows in from ``fetch`` a window at a time. Opening or scrolling costs
+    the same for ten rows or a hundred thousand. ``count()`` is re-read
+    after each fetch, so sources that load lazily grow as they scroll.
+    """
+
+    def __init__(self, parent, columns, fetch, count, on_heading=None, buffer_rows=50, height=15, bg=None):
+        super().__init__(parent, bg=bg)
+        self.fetch = fetch
+        self.count = count
+        self.buffer_rows = buffer_rows
+        self.offset = 0
+        self.total = 0
+        self.cache_start = 0
+        self.cache = []
+        self.cache_complete = False
+        self.items = []
+        self.attached = []
+
+        self.tree = ttk.Treeview(self, columns=[c for c, _ in columns], show="headings", height=height)
+        for col, text in columns:
+            self.tree.heading(col, text=text, command=(lambda c=col: on_heading(c)) if on_heading else "")
+            self.tree.column(col, anchor="center", width=120)
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self._wheel(-1 if e.delta > 0 else 1))
+        self.tree.bind("<Button-4>", lambda e: self._wheel(-1))
+        self.tree.bind("<Button-5>", lambda e: self._wheel(1))
+        self.tree.bind("<Prior>", lambda e: self._wheel(-len(self.items) // 3))
+        self.tree.bind("<Next>", lambda e: self._wheel(len(self.items) // 3))
+
+        self._resize_pool(height)
+        self.refresh()
+
+    def heading(self, column, text):
+        self.tree.heading(column, text=text)
+
+    def refresh(self, reset=False):
+        """Re-read the row count and drop cached rows, e.g. after a sort or new data"""
+        self.cache = []
+        if reset:
+            self.offset = 0
+        self._render()
+
+    def scroll(self, rows):
+        self.offset += rows
+        self._render()
+
+    def _wheel(self, steps):
+        self.scroll(steps * 3)
+        # Keep global <MouseWheel> bindings (the dashboard canvas) out of it
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * self.total)
+        elif unit == "pages":
+            self.offset += int(amount) * len(self.items)
+        else:
+            self.offset += int(amount)
+        self._render()
+
+    def _on_resize(self, event):
+        if not self.items or not self.attached[0]:
+            return
+        bbox = self.tree.bbox(self.items[0])
+        if not bbox:
+            return
+        _, heading_height, _, row_height = bbox
+        rows = max(1, (event.height - heading_height) // row_height)
+        if rows != len(self.items):
+            self._resize_pool(rows)
+            self._render()
+
+    def _resize_pool(self, rows):
+        while len(self.items) < rows:
+            self.items.append(self.tree.insert("", "end", values=()))
+            self.attached.append(True)
+        while len(self.items) > rows:
+            self.tree.delete(self.items.pop())
+            self.attached.pop()
+
+    def _rows(self, start, stop):
+        cache_stop = self.cache_start + len(self.cache)
+        cached = self.cache_start <= start and (stop <= cache_stop or self.cache_complete)
+        if not (self.cache and cached):
+            self.cache_start = max(0, start - self.buffer_rows)
+            wanted = stop + self.buffer_rows - self.cache_start
+            self.cache = self.fetch(self.cache_start, self.cache_start + wanted)
+            # A short page means the cache now reaches the last row
+            self.cache_complete = len(self.cache) < wanted
+        return self.cache[start - self.cache_start:stop - self.cache_start]
+
+    def _render(self):
+        visible = len(self.items)
+        self.offset = max(0, min(self.offset, self.count() - visible))
+        rows = self._rows(self.offset, self.offset + visible)
+        self.total = self.count()
+
+        for i, iid in enumerate(self.items):
+            if i < len(rows):
+                self.tree.item(iid, values=rows[i])
+                if not self.attached[i]:
+                    self.tree.reattach(iid, "", i)
+                    self.attached[i] = True
+            elif self.attached[i]:
+                self.tree.detach(iid)
+                self.attached[i] = False
+
+        if self.total > visible:
+            self.scrollbar.set(self.offset / self.total, (self.offset + visible) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
@@ -0,0 +1,58 @@
+import datetime
+
+
+# A workout's fields, in the order they are exported
+WORKOUT_FIELDS = ["date", "type", "duration_min", "calories", "notes", "created_at"]
+
+
+def _text(values, field):
+    value = values.get(field)
+    return "" if value is None else str(value).strip()
+
+
+def parse_workout(values, require_calories=False):
+    """Build a workout from raw form or CSV values, raising ValueError if they are invalid.
+
+    Workouts are plain dicts keyed by WORKOUT_FIELDS, which is how every
+    storage backend and WorkoutStore keep them. duration_min and calories
+    become ints; a blank calories means 0 unless require_calories is set,
+    as the Add Workout form does, and a missing created_at means now (UTC).
+    """
+    date = _text(values, "date")
+    try:
+        datetime.date.fromisoformat(date)
+    except ValueError:
+        raise ValueError(f"invalid date {date!r}, expected YYYY-MM-DD")
+
+    workout_type = _text(values, "type")
+    if not workout_type:
+        raise ValueError("missing workout type")
+
+    duration = _text(values, "duration_min")
+    if not duration:
+        raise ValueError("missing duration")
+    try:
+        duration = int(duration)
+    except ValueError:
+        raise ValueError(f"invalid duration {duration!r}")
+    if duration <= 0:
+        raise ValueError("duration must be greater than 0")
+
+    calories = _text(values, "calories")
+    if not calories and require_calories:
+        raise ValueError("missing calories")
+    try:
+        calories = int(calories or 0)
+    except ValueError:
+        raise ValueError(f"invalid calories {calories!r}")
+    if calories < 0:
+        raise ValueError("calories cannot be negative")
+
+    return {
+        "date": date,
+        "type": workout_type,
+        "duration_min": duration,
+        "calories": calories,
+        "notes": values.get("notes") or "",
+        "created_at": values.get("created_at") or datetime.datetime.utcnow().isoformat()
+    }
@@ -0,0 +1,290 @@
+import bisect
+from operator import itemgetter
+
+from rollups import Rollups
+
+
+INF = float("inf")
+
+# Batches at least this big are merged in one pass rather than inserted one by one
+BULK_THRESHOLD = 32
+
+# Fields sorted as numbers; a workout missing one sorts as 0
+NUMERIC_FIELDS = ("duration_min", "calories")
+
+
+def _date_key(workout):
+    return workout.get("date", "")
+
+
+def _newest_first(keys, lo, hi, cursor=None):
+    """Positions lo..hi of a run, newest date first but in the order added within a date.
+
+    With a cursor (a key), only positions after it in that order.
+    """
+    if cursor is not None:
+        # Finish the cursor's date, then carry on with older ones
+        date_end = min(hi, bisect.bisect_right(keys, (cursor[0], INF)))
+        yield from range(max(lo, bisect.bisect_right(keys, cursor)), date_end)
+        hi = min(hi, bisect.bisect_left(keys, (cursor[0],)))
+    while hi > lo:
+        date_start = bisect.bisect_left(keys, (keys[hi - 1][0],), lo, hi)
+        yield from range(date_start, hi)
+        hi = date_start
+
+
+class _SortedRun:
+    """Parallel key/item lists ordered by (date, seq)"""
+
+    __slots__ = ("keys", "items")
+
+    def __init__(self):
+        self.keys = []
+        self.items = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, item):
+        # New workouts are usually today's, which lands at the tail
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.items.insert(i, item)
+
+    def extend(self, pairs):
+        """Add (key, item) pairs given in key order"""
+        if not pairs:
+            return
+        keys, items = self.keys, self.items
+        if not keys or pairs[0][0] > keys[-1]:
+            # The usual case: the batch is all newer than what is stored
+            keys.extend([key for key, _ in pairs])
+            items.extend([item for _, item in pairs])
+            return
+        if len(pairs) < BULK_THRESHOLD:
+            for key, item in pairs:
+                self.add(key, item)
+            return
+        # Merge the batch into the tail it overlaps, copying stored slices
+        # between insertion points; the run before the batch stays put
+        start = pos = bisect.bisect_right(keys, pairs[0][0])
+        tail_keys, tail_items = [], []
+        for key, item in pairs:
+            i = bisect.bisect_right(keys, key, pos)
+            tail_keys += keys[pos:i]
+            tail_items += items[pos:i]
+            tail_keys.append(key)
+            tail_items.append(item)
+            pos = i
+        tail_keys += keys[pos:]
+        tail_items += items[pos:]
+        keys[start:] = tail_keys
+        items[start:] = tail_items
+
+    def span(self, date_from=None, date_to=None):
+        lo = bisect.bisect_left(self.keys, (date_from,)) if date_from else 0
+        hi = bisect.bisect_right(self.keys, (date_to, INF)) if date_to else len(self.keys)
+        return lo, hi
+
+
+class WorkoutStore:
+    """A user's workouts kept sorted by date, with a date -> workouts index.
+
+    Day lookups are a dict hit and date ranges are a bisect plus a slice,
+    so the dashboard and charts never walk the whole history. Workouts
+    sharing a date keep the order they were added in. ``rollups`` holds
+    running totals per day/week/month/type; pass persisted totals in to
+    skip rebuilding them from the workouts.
+
+    For ``query`` the workouts of one type, and those with notes, are
+    copied into their own date-ordered runs on first use, so filtered
+    searches only walk the smallest matching run. Like the other orders
+    they are dropped whenever the data changes.
+
+    ``analytics`` is a columnar NumPy copy for charts and stats. NumPy is
+    only imported when it is first used, and from then on it is kept in
+    step by add/extend like the rollups.
+    """
+
+    def __init__(self, workouts=(), rollups=None):
+        self._all = _SortedRun()
+        self._runs = {}
+        self._by_date = {}
+        self._sorted = {}
+        self._next_seq = 0
+        self._analytics = None
+        workouts = list(workouts)
+        self._insert_many(workouts)
+        self.rollups = rollups
+        if rollups is None:
+            self.rollups = Rollups()
+            self.rollups.extend(workouts)
+
+    def __len__(self):
+        return len(self._all)
+
+    def __iter__(self):
+        return iter(self._all.items)
+
+    @property
+    def analytics(self):
+        if self._analytics is None:
+            from analytics import WorkoutColumns
+            self._analytics = WorkoutColumns(self._all.items)
+        return self._analytics
+
+    def add(self, workout):
+        self._insert_many([workout])
+        self.rollups.add(workout)
+        if self._analytics is not None:
+            self._analytics.extend([workout])
+
+    def extend(self, workouts):
+        workouts = list(workouts)
+        self._insert_many(workouts)
+        self.rollups.extend(workouts)
+        if self._analytics is not None:
+            self._analytics.extend(workouts)
+
+    def _insert_many(self, workouts):
+        self._sorted.clear()
+        self._runs.clear()
+        pairs = []
+        for w in workouts:
+            pairs.append(((_date_key(w), self._next_seq), w))
+            self._next_seq += 1
+            self._by_date.setdefault(_date_key(w), []).append(w)
+
+        pairs.sort(key=itemgetter(0))
+        self._all.extend(pairs)
+
+    def _run(self, name, keep):
+        """The workouts keep() accepts, as a run built on first use"""
+        run = self._runs.get(name)
+        if run is None:
+            run = self._runs[name] = _SortedRun()
+            for key, w in zip(self._all.keys, self._all.items):
+                if keep(w):
+                    run.keys.append(key)
+                    run.items.append(w)
+        return run
+
+    def on_date(self, date):
+        """Workouts logged on an ISO date"""
+        return list(self._by_date.get(date, ()))
+
+    def between(self, start, end):
+        """Workouts dated start..end inclusive, oldest first"""
+        lo, hi = self._all.span(start, end)
+        return self._all.items[lo:hi]
+
+    def latest_first(self):
+        """Newest date first; workouts sharing a date in the order they were added"""
+        items = self._all.items
+        return (items[i] for i in _newest_first(self._all.keys, 0, len(items)))
+
+    def _ordered(self, field):
+        if field == "date":
+            return self._all.items
+        # Other orders are built on first use and kept until the data changes
+        ordered = self._sorted.get(field)
+        if ordered is None:
+            default = 0 if field in NUMERIC_FIELDS else ""
+            ordered = sorted(self._all.items, key=lambda w: w.get(field, default))
+            self._sorted[field] = ordered
+        return ordered
+
+    def page(self, start, stop, sort_by="date", descending=False):
+        """Rows start..stop of the workouts ordered by a field"""
+        if sort_by == "date" and descending:
+            latest = self._sorted.get("latest")
+            if latest is None:
+                latest = self._sorted["latest"] = list(self.latest_first())
+            return latest[start:stop]
+        items = self._ordered(sort_by)
+        if descending:
+            n = len(items)
+            return items[max(n - stop, 0):max(n - start, 0)][::-1]
+        return items[start:stop]
+
+    def query(self, date_from=None, date_to=None, workout_type=None, min_duration=None, max_duration=None,
+              min_calories=None, max_calories=None, note=None, sort_by="date", descending=True,
+              limit=100, cursor=None):
+        """Return (workouts, next_cursor) for one page of filtered workouts.
+
+        Dates are inclusive ISO strings; note is a case-insensitive
+        substring. Pass the returned cursor back in to get the next page;
+        it is None once the results are exhausted.
+        """
+        note = note.lower() if note else None
+
+        def matches(w):
+            date = w.get("date", "")
+            return not (
+                (date_from and date < date_from)
+                or (date_to and date > date_to)
+                or (workout_type and w.get("type") != workout_type)
+                or (min_duration is not None and w.get("duration_min", 0) < min_duration)
+                or (max_duration is not None and w.get("duration_min", 0) > max_duration)
+                or (min_calories is not None and w.get("calories", 0) < min_calories)
+                or (max_calories is not None and w.get("calories", 0) > max_calories)
+                or (note and note not in w.get("notes", "").lower())
+            )
+
+        if sort_by == "date":
+            # Walk whichever date-ordered run has the fewest candidates
+            runs = [self._all]
+            if workout_type:
+                runs.append(self._run(("type", workout_type), lambda w: w.get("type") == workout_type))
+            if note:
+                runs.append(self._run("noted", lambda w: w.get("notes")))
+            spans = [(run, *run.span(date_from, date_to)) for run in runs]
+            run, lo, hi = min(spans, key=lambda s: s[2] - s[1])
+            if descending:
+                positions = _newest_first(run.keys, lo, hi, cursor)
+            else:
+                if cursor is not None:
+                    lo = max(lo, bisect.bisect_right(run.keys, cursor))
+                positions = range(lo, hi)
+            keys, items = run.keys, run.items
+        else:
+            # Field orders have no per-type runs; the cursor is an offset
+            keys, items = None, self._ordered(sort_by)
+            start = cursor or 0
+            positions = range(len(items) - 1 - start, -1, -1) if descending else range(start, len(items))
+
+        page = []
+        last_key = None
+        for walked, i in enumerate(positions):
+            w = items[i]
+            if not matches(w):
+                continue
+            if len(page) == limit:
+                # One more match exists, so hand back where this page ended
+                return page, ((cursor or 0) + walked if keys is None else last_key)
+            page.append(w)
+            if keys is not None:
+                last_key = keys[i]
+        return page, None
+
+
+class QueryResults:
+    """Pulls query pages on demand so filtered results scroll like a list"""
+
+    def __init__(self, store, page_size=200, **filters):
+        self.store = store
+        self.page_size = page_size
+        self.filters = filters
+        self.loaded = []
+        self.cursor = None
+        self.exhausted = False
+
+    def __len__(self):
+        return len(self.loaded)
+
+    def rows(self, start, stop):
+        while len(self.loaded) < stop and not self.exhausted:
+            page, self.cursor = self.store.query(limit=self.page_size, cursor=self.cursor, **self.filters)
+            self.loaded.extend(page)
+            self.exhausted = self.cursor is None
+        return self.loaded[start:stop]